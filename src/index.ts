@@ -17,10 +17,15 @@ import { StreamableHTTPServerTransport } from '@modelcontextprotocol/sdk/server/
 import express, { Request, Response } from 'express';
 import cors from 'cors';
 import { randomUUID } from 'crypto';
+import { Server } from 'http';
 import dotenv from 'dotenv';
-import { isInitializeRequest } from '@modelcontextprotocol/sdk/types.js';
-import { registerAllCapabilities } from './registrations.js';
+import {
+  SUPPORTED_PROTOCOL_VERSIONS,
+  isInitializeRequest,
+} from '@modelcontextprotocol/sdk/types.js';
+import { cachedListResultJson, registerAllCapabilities } from './registrations.js';
 import { DatabaseSession, DatabaseConfig, createDatabaseSession } from './types/session.js';
+import { setStructuredResults } from './utils/format.js';
 
 // Load environment variables
 dotenv.config();
@@ -34,11 +39,30 @@ if (missingVars.length > 0) {
   process.exit(1);
 }
 
+/**
+ * Read a connection pool size from the environment, exiting on anything but a whole
+ * number of at least `minimum`
+ */
+function poolSizeEnv(name: string, minimum: number): number | undefined {
+  const value = process.env[name];
+  if (!value) {
+    return undefined;
+  }
+  if (!/^\d+$/.test(value.trim()) || parseInt(value) < minimum) {
+    console.error(`❌ ${name} must be a whole number of at least ${minimum}, got '${value}'`);
+    process.exit(1);
+  }
+  return parseInt(value);
+}
+
 // Configuration
 const config: DatabaseConfig = {
   postgres: {
     enabled: process.env.ENABLE_POSTGRES !== 'false',
     url: process.env.POSTGRES_URL || process.env.DATABASE_URL || undefined,
+    poolMax: poolSizeEnv('POSTGRES_POOL_MAX', 1),
+    poolMin: poolSizeEnv('POSTGRES_POOL_MIN', 0),
+    connectAll: process.env.POSTGRES_CONNECT_ALL === 'true',
   },
   redis: {
     enabled: process.env.ENABLE_REDIS === 'true',
@@ -57,6 +81,9 @@ const config: DatabaseConfig = {
   },
 };
 
+// Tool result format
+setStructuredResults(process.env.MCP_STRUCTURED_RESULTS === 'true');
+
 const serverConfig = {
   port: parseInt(process.env.PORT || '3001'),
   apiKey: process.env.API_KEY!,
@@ -71,6 +98,29 @@ const sessions: Map<string, DatabaseSession> = new Map();
 // Map to store transports by session ID for HTTP mode
 const transports: { [sessionId: string]: StreamableHTTPServerTransport } = {};
 
+// CORS policy for the HTTP transport. Preflights are answered with 204 by the cors
+// middleware itself, and browsers may reuse them for a day instead of preflighting
+// every MCP request
+const CORS_OPTIONS: cors.CorsOptions = {
+  origin: true,
+  exposedHeaders: ['mcp-session-id'],
+  allowedHeaders: ['Content-Type', 'mcp-session-id', 'API_KEY'],
+  maxAge: 86400,
+  optionsSuccessStatus: 204,
+};
+
+// Largest accepted MCP request body
+const MAX_MCP_BODY_BYTES = 4 * 1024 * 1024;
+
+// Most JSON-RPC messages accepted in one batched POST
+const MAX_BATCH_SIZE = 100;
+
+// Listening HTTP server, closed on shutdown
+let httpServer: Server | undefined;
+
+// Set once shutdown begins so repeated signals do not run it twice
+let shuttingDown = false;
+
 /**
  * Generate unique session ID
  */
@@ -96,9 +146,32 @@ async function initializeSessionClients(sessionId: string): Promise<DatabaseSess
 }
 
 /**
- * Create a new MCP server instance (stdio mode)
+ * Pre-serialized response for a list request whose result is already cached.
+ *
+ * Only plain, unpaginated single requests qualify; anything else goes through the transport.
+ */
+function cachedListResponse(body: any): string | undefined {
+  if (
+    !body ||
+    body.jsonrpc !== '2.0' ||
+    typeof body.method !== 'string' ||
+    (typeof body.id !== 'string' && typeof body.id !== 'number') ||
+    body.params?.cursor !== undefined
+  ) {
+    return undefined;
+  }
+
+  const result = cachedListResultJson(config, body.method);
+  if (result === undefined) {
+    return undefined;
+  }
+  return `{"result":${result},"jsonrpc":"2.0","id":${JSON.stringify(body.id)}}`;
+}
+
+/**
+ * Create a new MCP server instance bound to one session's database clients
  */
-function createServer(): McpServer {
+function createServer(sessionId: string = 'default'): McpServer {
   const server = new McpServer(
     {
       name: serverConfig.serverName,
@@ -113,7 +186,7 @@ function createServer(): McpServer {
   );
 
   // Register all tools and resources
-  registerAllCapabilities(server, config, sessions);
+  registerAllCapabilities(server, config, sessions, sessionId);
 
   return server;
 }
@@ -122,31 +195,13 @@ function createServer(): McpServer {
  * Create a new MCP server instance for a specific session (HTTP mode)
  */
 function createStatefulMCPServer(sessionId: string): McpServer {
-  const server = new McpServer(
-    {
-      name: serverConfig.serverName,
-      version: serverConfig.serverVersion,
-    },
-    {
-      capabilities: {
-        tools: {},
-        resources: {},
-      },
-    }
-  );
-
-  // Get session
-  const session = sessions.get(sessionId);
-  if (!session) {
+  if (!sessions.has(sessionId)) {
     throw new Error(`Session ${sessionId} not found`);
   }
 
   console.error(`[${sessionId}] Creating MCP server for session`);
 
-  // Register all tools and resources for this session
-  registerAllCapabilities(server, config, sessions);
-
-  return server;
+  return createServer(sessionId);
 }
 
 /**
@@ -187,7 +242,7 @@ async function runStdioServer() {
   const sessionId = 'stdio-session';
   await initializeSessionClients(sessionId);
 
-  const server = createServer();
+  const server = createServer(sessionId);
   const transport = new StdioServerTransport();
 
   await server.connect(transport);
@@ -200,17 +255,38 @@ async function runStdioServer() {
 async function runStatefulHttpServer(host: string, port: number) {
   const app = express();
 
-  // Enable CORS for all routes
-  app.use(
-    cors({
-      origin: true,
-      exposedHeaders: ['mcp-session-id'],
-      allowedHeaders: ['Content-Type', 'mcp-session-id', 'API_KEY'],
-    })
-  );
+  // Enable CORS for all routes; preflight requests end in the middleware
+  app.use(cors(CORS_OPTIONS));
+
+  // Parse JSON bodies, rejecting oversized ones before they are buffered in full
+  app.use(express.json({ limit: MAX_MCP_BODY_BYTES }));
 
-  // Parse JSON bodies
-  app.use(express.json());
+  // Report body parsing failures as JSON-RPC errors rather than HTML error pages
+  app.use((error: any, _req: Request, res: Response, next: (error?: unknown) => void) => {
+    if (error?.type === 'entity.too.large') {
+      res.status(413).json({
+        jsonrpc: '2.0',
+        error: {
+          code: -32600,
+          message: `Request body exceeds ${MAX_MCP_BODY_BYTES} bytes`,
+        },
+        id: null,
+      });
+      return;
+    }
+    if (error?.type === 'entity.parse.failed') {
+      res.status(400).json({
+        jsonrpc: '2.0',
+        error: {
+          code: -32700,
+          message: 'Parse error: Invalid JSON',
+        },
+        id: null,
+      });
+      return;
+    }
+    next(error);
+  });
 
   // API Key authentication middleware
   function validateApiKey(req: Request, res: Response, next: any) {
@@ -276,6 +352,47 @@ async function runStatefulHttpServer(host: string, port: number) {
     });
   });
 
+  // Configure DNS rebinding protection and allowed hosts, shared by every session's transport
+  const enableDnsRebindingProtection =
+    process.env.MCP_ENABLE_DNS_REBINDING_PROTECTION !== 'false';
+  const allowedHosts: string[] = [];
+
+  if (enableDnsRebindingProtection) {
+    // Start with default localhost addresses
+    allowedHosts.push('127.0.0.1', 'localhost', `127.0.0.1:${port}`, `localhost:${port}`);
+
+    // Add the current host if not localhost
+    if (host !== '127.0.0.1' && host !== 'localhost') {
+      allowedHosts.push(host, `${host}:${port}`);
+    }
+
+    // Add custom allowed hosts from environment variable
+    const customHosts = process.env.MCP_ALLOWED_HOSTS;
+    if (customHosts) {
+      allowedHosts.push(...customHosts.split(',').map(h => h.trim()));
+    }
+  }
+
+  /**
+   * Whether a request passes the header checks the transport would apply: the Host allow-list,
+   * the negotiated protocol version and an Accept header covering both response types.
+   * Requests that fail any of them are left to the transport, which rejects them.
+   */
+  function passesTransportChecks(req: Request): boolean {
+    if (enableDnsRebindingProtection && !allowedHosts.includes(req.headers.host ?? '')) {
+      return false;
+    }
+    const protocolVersion = req.headers['mcp-protocol-version'];
+    if (
+      protocolVersion !== undefined &&
+      !SUPPORTED_PROTOCOL_VERSIONS.includes(String(protocolVersion))
+    ) {
+      return false;
+    }
+    const accept = req.headers.accept ?? '';
+    return accept.includes('application/json') && accept.includes('text/event-stream');
+  }
+
   // Handle POST requests for client-to-server communication
   app.post('/mcp', validateApiKey, async (req: Request, res: Response) => {
     // Check for existing session ID
@@ -283,6 +400,32 @@ async function runStatefulHttpServer(host: string, port: number) {
     let transport: StreamableHTTPServerTransport;
     let server: McpServer;
 
+    // The transport accepts JSON-RPC batches, letting clients send many calls in one
+    // round trip; bound their size so one POST cannot queue unbounded work
+    if (Array.isArray(req.body) && req.body.length > MAX_BATCH_SIZE) {
+      res.status(400).json({
+        jsonrpc: '2.0',
+        error: {
+          code: -32600,
+          message: `Invalid Request: batch exceeds ${MAX_BATCH_SIZE} messages`,
+        },
+        id: null,
+      });
+      return;
+    }
+
+    // Repeated list requests on a live session are answered with cached JSON directly, once
+    // they pass the same header checks the transport would apply
+    const cached =
+      sessionId && transports[sessionId] && passesTransportChecks(req)
+        ? cachedListResponse(req.body)
+        : undefined;
+    if (cached !== undefined) {
+      res.setHeader('mcp-session-id', sessionId!);
+      res.type('application/json').send(cached);
+      return;
+    }
+
     if (sessionId && transports[sessionId]) {
       // Reuse existing transport and session
       transport = transports[sessionId];
@@ -298,27 +441,8 @@ async function runStatefulHttpServer(host: string, port: number) {
       // Create stateful server for this session
       server = createStatefulMCPServer(newSessionId);
 
-      // Create transport with session management
-      // Configure DNS rebinding protection and allowed hosts
-      const enableDnsRebindingProtection =
-        process.env.MCP_ENABLE_DNS_REBINDING_PROTECTION !== 'false';
-      const allowedHosts: string[] = [];
-
+      // Create transport with session management and the shared DNS rebinding settings
       if (enableDnsRebindingProtection) {
-        // Start with default localhost addresses
-        allowedHosts.push('127.0.0.1', 'localhost', `127.0.0.1:${port}`, `localhost:${port}`);
-
-        // Add the current host if not localhost
-        if (host !== '127.0.0.1' && host !== 'localhost') {
-          allowedHosts.push(host, `${host}:${port}`);
-        }
-
-        // Add custom allowed hosts from environment variable
-        const customHosts = process.env.MCP_ALLOWED_HOSTS;
-        if (customHosts) {
-          allowedHosts.push(...customHosts.split(',').map(h => h.trim()));
-        }
-
         console.error(
           `[${newSessionId}] DNS rebinding protection ENABLED. Allowed hosts: ${allowedHosts.join(', ')}`
         );
@@ -416,7 +540,7 @@ async function runStatefulHttpServer(host: string, port: number) {
     await transport.handleRequest(req, res);
   });
 
-  app.listen(port, host, () => {
+  httpServer = app.listen(port, host, () => {
     const authEnabled = !!serverConfig.apiKey;
     console.error(`✅ Database MCP Server started in STATEFUL HTTP mode on ${host}:${port}`);
     console.error(`🔍 Health check available at: http://${host}:${port}/health`);
@@ -430,23 +554,38 @@ async function runStatefulHttpServer(host: string, port: number) {
   });
 }
 
-// Graceful shutdown handling
-process.on('SIGINT', async () => {
-  console.error('🛑 Shutting down database MCP server...');
-
-  // Clean up all database connections
-  for (const [sessionId, session] of sessions) {
-    try {
-      await session.cleanup();
-      console.error(`✅ Cleaned up session: ${sessionId}`);
-    } catch (error) {
-      console.error(`❌ Error cleaning up session ${sessionId}:`, error);
-    }
+/**
+ * Stop accepting connections, close every session's database clients and exit
+ */
+async function shutdown(signal: string): Promise<void> {
+  if (shuttingDown) {
+    return;
   }
+  shuttingDown = true;
+  console.error(`🛑 Shutting down database MCP server (${signal})...`);
+
+  // Stop accepting new HTTP connections; in-flight requests are not awaited
+  httpServer?.close();
+
+  // Clean up all database connections, every session at once
+  await Promise.allSettled(
+    Array.from(sessions, async ([sessionId, session]) => {
+      try {
+        await session.cleanup();
+        console.error(`✅ Cleaned up session: ${sessionId}`);
+      } catch (error) {
+        console.error(`❌ Error cleaning up session ${sessionId}:`, error);
+      }
+    })
+  );
 
   sessions.clear();
   process.exit(0);
-});
+}
+
+// Graceful shutdown handling: Ctrl+C locally, SIGTERM from container orchestrators
+process.on('SIGINT', () => void shutdown('SIGINT'));
+process.on('SIGTERM', () => void shutdown('SIGTERM'));
 
 // Handle unhandled rejections
 process.on('unhandledRejection', (reason, promise) => {
@@ -0,0 +1,688 @@
+/**
+ * PostgreSQL Connection Manager
+ *
+ * Keeps one bounded connection pool per database on the configured server, so
+ * tools reuse established connections instead of paying a handshake per call.
+ */
+
+import { createHash } from 'crypto';
+import { Pool, PoolClient, QueryResult, escapeIdentifier } from 'pg';
+import { Singleflight, TtlCache } from '../utils/cache.js';
+
+// Default upper bound on connections held open per database
+const DEFAULT_POOL_MAX = 10;
+
+// Connections opened when a pool is warmed and kept open while idle
+const DEFAULT_POOL_MIN = 2;
+
+// Idle connections are released after this long
+const POOL_IDLE_TIMEOUT_MS = 30_000;
+
+// Databases connected at once by connectAll, so startup does not storm the server
+const CONNECT_CONCURRENCY = 16;
+
+// How long the server's database list is reused; database DDL run here clears it sooner
+const DATABASE_LIST_TTL_MS = 30_000;
+
+// Statements that change which databases exist
+const DATABASE_DDL_PATTERN = /\b(CREATE|DROP|ALTER)\s+DATABASE\b/i;
+
+// Statements that only read, so their results may be reused until the next write
+const READ_ONLY_PATTERN = /^\s*(SELECT|SHOW|VALUES|TABLE)\b/i;
+
+// Clauses that make a read statement create a table or lock the rows it returns
+const WRITING_CLAUSE_PATTERN = /\b(INTO|FOR\s+(NO\s+KEY\s+)?UPDATE|FOR\s+(KEY\s+)?SHARE)\b/i;
+
+// Function calls with effects beyond their result: sequences, locks, notifications, settings
+const SIDE_EFFECT_FUNCTIONS = [
+  'nextval',
+  'setval',
+  'pg_(try_)?advisory_\\w+',
+  'pg_notify',
+  'set_config',
+  'pg_sleep\\w*',
+  'pg_terminate_backend',
+  'pg_cancel_backend',
+  'pg_reload_conf',
+  'pg_stat_reset\\w*',
+  'pg_create_\\w+',
+  'pg_drop_\\w+',
+  'pg_switch_wal',
+  'txid_current',
+  'pg_current_xact_id',
+  'dblink\\w*',
+  'lo_\\w+',
+];
+const SIDE_EFFECT_FUNCTION_PATTERN = new RegExp(
+  `\\b(${SIDE_EFFECT_FUNCTIONS.join('|')})\\s*\\(`,
+  'i'
+);
+
+// Values that differ between identical calls, so a read using them must not be reused
+const VOLATILE_FUNCTIONS = [
+  'random',
+  'now',
+  'clock_timestamp',
+  'statement_timestamp',
+  'transaction_timestamp',
+  'timeofday',
+  'gen_random_uuid',
+  'uuid_generate_\\w+',
+  'currval',
+  'lastval',
+];
+const VOLATILE_PATTERN = new RegExp(
+  `\\b(${VOLATILE_FUNCTIONS.join('|')})\\s*\\(|` +
+    '\\b(current_timestamp|current_time|current_date|localtime|localtimestamp|TABLESAMPLE)\\b',
+  'i'
+);
+
+/**
+ * Whether a statement only reads: a single SELECT, SHOW, VALUES or TABLE statement that does
+ * not create a table, lock rows or call a function with side effects
+ */
+export function isReadOnlyQuery(sql: string): boolean {
+  return (
+    READ_ONLY_PATTERN.test(sql) &&
+    isSingleStatement(sql) &&
+    !WRITING_CLAUSE_PATTERN.test(sql) &&
+    !SIDE_EFFECT_FUNCTION_PATTERN.test(sql)
+  );
+}
+
+/**
+ * Whether a statement can be answered from a recent identical read
+ */
+export function isCacheableQuery(sql: string): boolean {
+  return isReadOnlyQuery(sql) && !VOLATILE_PATTERN.test(sql);
+}
+
+// Statements whose effect outlives the call on a pooled connection: transaction control,
+// session settings, notifications, prepared statements, cursors and temporary objects
+const SESSION_STATEMENT_PATTERN =
+  /^\s*(BEGIN|START\s+TRANSACTION|COMMIT|END|ROLLBACK|ABORT|SAVEPOINT|RELEASE|SET|RESET|LISTEN|UNLISTEN|DISCARD|PREPARE|DEALLOCATE|DECLARE|CREATE\s+((GLOBAL|LOCAL)\s+)?TEMP(ORARY)?)\b/i;
+
+// Session-level advisory locks, held by the connection until it unlocks them
+const SESSION_LOCK_PATTERN = /\b(pg_(try_)?advisory_lock(_shared)?)\s*\(/i;
+
+// set_config calls; only those with is_local = true end with the transaction
+const SET_CONFIG_PATTERN = /\bset_config\s*\(([^()]*)\)?/gi;
+
+// Opening delimiter of a dollar-quoted string: $$ or $tag$
+const DOLLAR_QUOTE_PATTERN = /\$([A-Za-z_][A-Za-z0-9_]*)?\$/y;
+
+/**
+ * Index of the quote closing a literal or quoted identifier opened at `start`, treating a
+ * doubled quote (and, in E'' strings, a backslash) as an escape
+ */
+function closingQuote(sql: string, start: number, quote: string, backslashes: boolean): number {
+  let i = start + 1;
+  while (i < sql.length) {
+    if (backslashes && sql[i] === '\\') {
+      i += 2;
+    } else if (sql[i] === quote && sql[i + 1] === quote) {
+      i += 2;
+    } else if (sql[i] === quote) {
+      return i;
+    } else {
+      i++;
+    }
+  }
+  return sql.length;
+}
+
+/**
+ * Split SQL into statements on semicolons outside string literals, quoted identifiers,
+ * dollar-quoted bodies and comments. String and dollar-quoted contents come back blanked
+ * and comments as a space, so checks on the result only see the statement's own code.
+ */
+export function splitStatements(sql: string): string[] {
+  const statements: string[] = [];
+  let current = '';
+  let i = 0;
+
+  while (i < sql.length) {
+    const char = sql[i]!;
+    const next = sql[i + 1];
+    DOLLAR_QUOTE_PATTERN.lastIndex = i;
+
+    if (char === ';') {
+      statements.push(current);
+      current = '';
+      i++;
+    } else if (char === "'") {
+      const escapes = /(^|[^\w$])[eE]$/.test(current);
+      current += "''";
+      i = closingQuote(sql, i, "'", escapes) + 1;
+    } else if (char === '"') {
+      const end = closingQuote(sql, i, '"', false);
+      current += sql.slice(i, end + 1);
+      i = end + 1;
+    } else if (char === '-' && next === '-') {
+      const end = sql.indexOf('\n', i);
+      current += ' ';
+      i = end === -1 ? sql.length : end;
+    } else if (char === '/' && next === '*') {
+      // Block comments nest in PostgreSQL
+      let depth = 1;
+      i += 2;
+      while (i < sql.length && depth > 0) {
+        if (sql.startsWith('/*', i)) {
+          depth++;
+          i += 2;
+        } else if (sql.startsWith('*/', i)) {
+          depth--;
+          i += 2;
+        } else {
+          i++;
+        }
+      }
+      current += ' ';
+    } else if (char === '$' && !/[\w$]$/.test(current) && DOLLAR_QUOTE_PATTERN.test(sql)) {
+      const delimiter = sql.slice(i, DOLLAR_QUOTE_PATTERN.lastIndex);
+      const end = sql.indexOf(delimiter, DOLLAR_QUOTE_PATTERN.lastIndex);
+      current += '$$';
+      i = end === -1 ? sql.length : end + delimiter.length;
+    } else {
+      current += char;
+      i++;
+    }
+  }
+  statements.push(current);
+
+  return statements.map(statement => statement.trim()).filter(statement => statement !== '');
+}
+
+/**
+ * Reject statements that would leave state on a pooled connection for whichever call
+ * borrows it next: session-scoped statements, session-level set_config calls and
+ * session advisory locks
+ */
+export function assertStateless(sql: string): void {
+  for (const statement of splitStatements(sql)) {
+    const keyword = SESSION_STATEMENT_PATTERN.exec(statement)?.[1];
+    if (keyword) {
+      throw new Error(
+        `${keyword.replace(/\s+/g, ' ').toUpperCase()} is not supported: connections are ` +
+          'pooled and shared between calls. Send related statements together in one call, ' +
+          'which runs them in a single implicit transaction'
+      );
+    }
+
+    const lock = SESSION_LOCK_PATTERN.exec(statement)?.[1];
+    if (lock) {
+      throw new Error(
+        `${lock.toLowerCase()}() is not supported: connections are pooled, so a session lock ` +
+          'would outlive the call; use the pg_advisory_xact_* variants instead'
+      );
+    }
+
+    for (const [, args] of statement.matchAll(SET_CONFIG_PATTERN)) {
+      if (args === undefined || !/,\s*true\s*$/i.test(args)) {
+        throw new Error(
+          'set_config() is only supported with is_local = true: connections are pooled, so ' +
+            'a session setting would outlive the call'
+        );
+      }
+    }
+  }
+}
+
+// Prepared statements kept per connection before the least recently used is deallocated
+const STATEMENT_CACHE_SIZE = 256;
+
+// SQLSTATE raised when a cached plan's result shape no longer matches the schema
+const FEATURE_NOT_SUPPORTED = '0A000';
+
+/**
+ * Whether SQL is a single statement, which the extended protocol requires for PREPARE
+ */
+function isSingleStatement(sql: string): boolean {
+  return !sql.trim().replace(/;\s*$/, '').includes(';');
+}
+
+// Single-table INSERT ... VALUES statement; group 1 is everything up to VALUES
+export const INSERT_VALUES_PATTERN =
+  /^\s*(INSERT\s+INTO\s+[^\s(]+\s*\([^)]*\)\s*VALUES)\s*(\(.*\))\s*;?\s*$/is;
+
+// Clauses that make an INSERT unsafe to merge with others, and comments, which could swallow
+// the rows appended after them
+const INSERT_UNMERGEABLE_PATTERN = /\b(ON\s+CONFLICT|RETURNING|SELECT|DEFAULT\s+VALUES)\b|--|\/\*/i;
+
+// Upper bound on queued INSERTs folded into one multi-row statement
+const MAX_INSERT_BATCH = 500;
+
+/**
+ * Split a plain INSERT ... VALUES statement into its target and row tuples
+ */
+export function parseInsert(
+  sql: string
+): { target: string; key: string; rows: string } | undefined {
+  if (!isSingleStatement(sql) || INSERT_UNMERGEABLE_PATTERN.test(sql)) {
+    return undefined;
+  }
+  const match = INSERT_VALUES_PATTERN.exec(sql);
+  if (!match) {
+    return undefined;
+  }
+  return { target: match[1]!, key: match[1]!.replace(/\s+/g, ' '), rows: match[2]! };
+}
+
+// Unquoted PostgreSQL identifier: letter or underscore, then letters, digits, underscores or $
+const IDENTIFIER_PATTERN = /^[A-Za-z_][A-Za-z0-9_$]{0,62}$/;
+
+/**
+ * Validate and quote a single identifier for DDL, folding it to lower case the way PostgreSQL
+ * folds unquoted names so "Users" still creates the table that later unquoted SQL refers to
+ */
+export function quoteIdentifier(name: string): string {
+  if (!IDENTIFIER_PATTERN.test(name)) {
+    throw new Error(`Invalid identifier '${name}'`);
+  }
+  return escapeIdentifier(name.toLowerCase());
+}
+
+/**
+ * Validate and quote an optionally schema-qualified name (e.g. "public.users")
+ */
+export function quoteQualifiedName(name: string): string {
+  return name.split('.').map(quoteIdentifier).join('.');
+}
+
+/**
+ * Deterministic prepared statement name for a SQL text
+ */
+function statementName(sql: string): string {
+  return `mcp_${createHash('sha1').update(sql).digest('hex')}`;
+}
+
+/**
+ * pg tracks which statements a connection has parsed on a private field; evicted
+ * statements must be removed there too or pg would skip re-preparing them.
+ */
+function parsedStatements(client: PoolClient): Record<string, string> {
+  return (client as unknown as { connection: { parsedStatements: Record<string, string> } })
+    .connection.parsedStatements;
+}
+
+/**
+ * Connection counters for a single database pool
+ */
+export interface PostgresPoolStats {
+  database: string;
+  total: number;
+  idle: number;
+  waiting: number;
+}
+
+/**
+ * A statement waiting in a database's background write queue
+ */
+interface QueuedWrite {
+  id: number;
+  sql: string;
+}
+
+export class PostgresManager {
+  readonly defaultDatabase: string;
+  // Connection settings are derived once; pools differ only in the database path
+  private readonly url: URL;
+  private readonly ssl: false | { rejectUnauthorized: false };
+  private readonly poolMax: number;
+  private readonly poolMin: number;
+  private readonly pools = new Map<string, Pool>();
+  // Statement names prepared on each pooled connection, least recently used first
+  private readonly statements = new WeakMap<PoolClient, Set<string>>();
+  // Pending background writes per database; an entry exists while its writer is running
+  private readonly writeQueues = new Map<string, QueuedWrite[]>();
+  private readonly writesIdle: Array<() => void> = [];
+  private nextWriteId = 1;
+  private readonly databaseList = new TtlCache<string, string[]>(DATABASE_LIST_TTL_MS);
+  private readonly databaseListing = new Singleflight<string, string[]>();
+  private readonly writeGenerations = new Map<string, number>();
+
+  constructor(
+    url: string,
+    poolMax: number = DEFAULT_POOL_MAX,
+    poolMin: number = DEFAULT_POOL_MIN
+  ) {
+    this.url = new URL(url);
+    this.ssl = url.includes('localhost') ? false : { rejectUnauthorized: false };
+    this.poolMax = poolMax;
+    this.poolMin = Math.min(poolMin, poolMax);
+    this.defaultDatabase = decodeURIComponent(this.url.pathname.slice(1)) || 'postgres';
+  }
+
+  /**
+   * Get the pool for a database, creating it on first use
+   */
+  pool(database: string = this.defaultDatabase): Pool {
+    let pool = this.pools.get(database);
+    if (!pool) {
+      const url = new URL(this.url);
+      url.pathname = `/${encodeURIComponent(database)}`;
+
+      pool = new Pool({
+        connectionString: url.toString(),
+        ssl: this.ssl,
+        max: this.poolMax,
+        min: this.poolMin,
+        idleTimeoutMillis: POOL_IDLE_TIMEOUT_MS,
+      });
+      // Idle clients can error when the server drops them; the pool discards them
+      pool.on('error', error => {
+        console.error(`PostgreSQL pool error on '${database}':`, error);
+      });
+      this.pools.set(database, pool);
+    }
+    return pool;
+  }
+
+  /**
+   * Open a pool for every other database on the server that accepts connections.
+   *
+   * Databases are connected concurrently, at most CONNECT_CONCURRENCY at a time. One
+   * that fails to connect is logged and its pool discarded. Returns the databases
+   * that connected.
+   */
+  async connectAll(): Promise<string[]> {
+    const result = await this.pool().query<{ datname: string }>(
+      'SELECT datname FROM pg_database WHERE datallowconn AND NOT datistemplate ORDER BY datname'
+    );
+    const databases = result.rows
+      .map(row => row.datname)
+      .filter(database => database !== this.defaultDatabase);
+
+    const connected: string[] = [];
+    let next = 0;
+    const worker = async () => {
+      while (next < databases.length) {
+        const database = databases[next++]!;
+        try {
+          await this.warm(database);
+          connected.push(database);
+        } catch (error) {
+          console.error(`Failed to connect to PostgreSQL database '${database}':`, error);
+          const pool = this.pools.get(database);
+          this.pools.delete(database);
+          await pool?.end();
+        }
+      }
+    };
+
+    await Promise.all(
+      Array.from({ length: Math.min(CONNECT_CONCURRENCY, databases.length) }, worker)
+    );
+    return connected;
+  }
+
+  /**
+   * Open a database's minimum number of pooled connections at once, so the first tool
+   * calls skip the TCP and TLS handshake. The pool keeps them open while idle.
+   */
+  async warm(database: string = this.defaultDatabase): Promise<void> {
+    const pool = this.pool(database);
+    const clients = await Promise.allSettled(
+      Array.from({ length: Math.max(this.poolMin, 1) }, () => pool.connect())
+    );
+
+    let failure: unknown;
+    for (const client of clients) {
+      if (client.status === 'fulfilled') {
+        client.value.release();
+      } else {
+        failure ??= client.reason;
+      }
+    }
+    if (failure !== undefined) {
+      throw failure;
+    }
+  }
+
+  /**
+   * List databases on the server that accept connections, reusing a recent or
+   * in-flight result
+   */
+  async listDatabases(): Promise<string[]> {
+    const cached = this.databaseList.get('databases');
+    if (cached !== undefined) {
+      return cached;
+    }
+
+    return this.databaseListing.run('databases', async () => {
+      const result = await this.pool().query<{ datname: string }>(
+        'SELECT datname FROM pg_database WHERE datallowconn = true ORDER BY datname'
+      );
+      const databases = result.rows.map(row => row.datname);
+      this.databaseList.set('databases', databases);
+      return databases;
+    });
+  }
+
+  /**
+   * Run a statement unprepared, forgetting the cached database list if it may change it
+   */
+  async execute(database: string, sql: string): Promise<QueryResult> {
+    assertStateless(sql);
+    try {
+      return await this.pool(database).query(sql);
+    } finally {
+      this.markWritten(database);
+      if (DATABASE_DDL_PATTERN.test(sql)) {
+        this.databaseList.clear();
+      }
+    }
+  }
+
+  /**
+   * Run a query, bumping the write generation once a statement that may write has
+   * finished, so reads cached while it ran are not reused
+   */
+  async query(database: string, sql: string): Promise<QueryResult> {
+    assertStateless(sql);
+    try {
+      return await this.runQuery(database, sql);
+    } finally {
+      if (!isReadOnlyQuery(sql)) {
+        this.markWritten(database);
+      }
+    }
+  }
+
+  /**
+   * Run a single statement as a named prepared statement, or several unprepared.
+   *
+   * Repeated SQL on a connection skips parse and planning; each connection keeps at
+   * most STATEMENT_CACHE_SIZE statements and deallocates the least recently used.
+   */
+  private async runQuery(database: string, sql: string): Promise<QueryResult> {
+    if (!isSingleStatement(sql)) {
+      // pg resolves SQL holding several statements to one result per statement; the last
+      // is returned, as psql prints
+      const results: QueryResult | QueryResult[] = await this.pool(database).query(sql);
+      return Array.isArray(results) ? results[results.length - 1]! : results;
+    }
+
+    const name = statementName(sql);
+    const client = await this.pool(database).connect();
+    try {
+      let result: QueryResult;
+      try {
+        result = await client.query({ name, text: sql });
+      } catch (error) {
+        // A schema change invalidated the cached plan: drop it and run unprepared
+        if ((error as { code?: string }).code !== FEATURE_NOT_SUPPORTED) {
+          // Parse can succeed before execution fails, leaving the statement on the
+          // connection; track it so the cap still holds, keeping the caller's error
+          if (parsedStatements(client)[name] !== undefined) {
+            await this.remember(client, name).catch(() => undefined);
+          }
+          throw error;
+        }
+        await this.deallocate(client, name);
+        return await client.query(sql);
+      }
+      await this.remember(client, name);
+      return result;
+    } finally {
+      client.release();
+    }
+  }
+
+  /**
+   * Counter bumped by every write to a database, for keying cached reads
+   */
+  writeGeneration(database: string): number {
+    return this.writeGenerations.get(database) ?? 0;
+  }
+
+  private markWritten(database: string): void {
+    this.writeGenerations.set(database, this.writeGeneration(database) + 1);
+  }
+
+  /**
+   * Record a statement as most recently used, evicting the oldest beyond capacity
+   */
+  private async remember(client: PoolClient, name: string): Promise<void> {
+    let names = this.statements.get(client);
+    if (!names) {
+      names = new Set();
+      this.statements.set(client, names);
+    }
+
+    names.delete(name);
+    names.add(name);
+    if (names.size > STATEMENT_CACHE_SIZE) {
+      const oldest = names.values().next().value as string;
+      await this.deallocate(client, oldest);
+    }
+  }
+
+  /**
+   * Drop a prepared statement from a connection
+   */
+  private async deallocate(client: PoolClient, name: string): Promise<void> {
+    this.statements.get(client)?.delete(name);
+    if (parsedStatements(client)[name] !== undefined) {
+      await client.query(`DEALLOCATE ${escapeIdentifier(name)}`);
+      delete parsedStatements(client)[name];
+    }
+  }
+
+  /**
+   * Queue a write to run in the background and return its id immediately.
+   *
+   * Each database has a single writer, so queued statements keep their order.
+   * Failures are logged since the caller is no longer waiting on the result.
+   */
+  enqueueWrite(database: string, sql: string): number {
+    assertStateless(sql);
+    const write = { id: this.nextWriteId++, sql };
+    this.markWritten(database);
+    const queue = this.writeQueues.get(database);
+
+    if (queue) {
+      queue.push(write);
+    } else {
+      this.writeQueues.set(database, [write]);
+      void this.drainWrites(database);
+    }
+    return write.id;
+  }
+
+  /**
+   * Run a database's queued writes until its queue is empty.
+   *
+   * Consecutive INSERTs into the same table and columns that piled up while the
+   * previous write was in flight are folded into one multi-row INSERT.
+   */
+  private async drainWrites(database: string): Promise<void> {
+    const queue = this.writeQueues.get(database)!;
+
+    for (let write = queue.shift(); write; write = queue.shift()) {
+      const insert = parseInsert(write.sql);
+      const batch = [write];
+      const rows = insert ? [insert.rows] : [];
+
+      while (insert && queue.length > 0 && batch.length < MAX_INSERT_BATCH) {
+        const next = parseInsert(queue[0]!.sql);
+        if (!next || next.key !== insert.key) {
+          break;
+        }
+        batch.push(queue.shift()!);
+        rows.push(next.rows);
+      }
+
+      if (insert && batch.length > 1) {
+        try {
+          await this.pool(database).query(`${insert.target} ${rows.join(', ')}`);
+          this.markWritten(database);
+          continue;
+        } catch (error) {
+          // The merged INSERT is atomic; fall back so one bad row cannot drop the rest
+          console.error(`Batched insert of ${batch.length} writes on '${database}' failed:`, error);
+        }
+      }
+
+      for (const item of batch) {
+        try {
+          await this.execute(database, item.sql);
+        } catch (error) {
+          console.error(`Background write #${item.id} on '${database}' failed:`, error);
+        }
+      }
+    }
+
+    this.writeQueues.delete(database);
+    if (this.writeQueues.size === 0) {
+      this.writesIdle.splice(0).forEach(resolve => resolve());
+    }
+  }
+
+  /**
+   * Wait until every queued background write has run
+   */
+  async flushWrites(): Promise<void> {
+    if (this.writeQueues.size > 0) {
+      await new Promise<void>(resolve => this.writesIdle.push(resolve));
+    }
+  }
+
+  /**
+   * Check every open pool at once, each on its own connection, reporting which answered
+   */
+  async ping(): Promise<Record<string, boolean>> {
+    const checks = Array.from(this.pools, async ([database, pool]) => {
+      try {
+        await pool.query('SELECT 1');
+        return [database, true] as const;
+      } catch {
+        return [database, false] as const;
+      }
+    });
+    return Object.fromEntries(await Promise.all(checks));
+  }
+
+  /**
+   * Connection counters for every open pool
+   */
+  stats(): PostgresPoolStats[] {
+    return Array.from(this.pools, ([database, pool]) => ({
+      database,
+      total: pool.totalCount,
+      idle: pool.idleCount,
+      waiting: pool.waitingCount,
+    }));
+  }
+
+  /**
+   * Close every pool once queued background writes have run
+   */
+  async end(): Promise<void> {
+    await this.flushWrites();
+    for (const pool of this.pools.values()) {
+      await pool.end();
+    }
+    this.pools.clear();
+  }
+}
@@ -0,0 +1,558 @@
+/**
+ * Redis Connection Manager
+ *
+ * Owns a Redis connection plus one long-lived client per logical database. A
+ * manager is shared by every session connected to the same server, so neither
+ * tool calls nor new sessions construct connections of their own.
+ */
+
+import type Redis from 'ioredis';
+import type { Result } from 'ioredis';
+import { TtlCache } from '../utils/cache.js';
+
+/**
+ * A logical database that currently holds keys
+ */
+export interface RedisDatabaseSummary {
+  database: number;
+  keys: number;
+}
+
+/**
+ * Metadata describing a single Redis key
+ */
+export interface RedisKeyInfo {
+  key: string;
+  type: string;
+  ttl: number;
+  encoding: string | null;
+  memory_usage: number | null;
+}
+
+// Keys requested per SCAN call; Redis' default of 10 costs far too many round trips
+const SCAN_COUNT = 1000;
+
+// Ceiling for the COUNT hint as getKeys widens its SCAN calls over stretches with no matches
+const MAX_SCAN_COUNT = 16_000;
+
+// Glob metacharacters in a SCAN MATCH pattern
+const GLOB_PATTERN = /[*?[\\]/;
+
+// How long INFO responses are reused for bursts of identical resource reads
+const INFO_CACHE_TTL_MS = 2000;
+
+// How long key values and key metadata are reused for identical reads
+const KEY_CACHE_TTL_MS = 5000;
+
+// Keys whose value or metadata is cached at once; values can be large, so this stays modest
+const KEY_CACHE_SIZE = 1000;
+
+// Commands pipelined per key by getKeysInfo: TYPE, TTL, OBJECT ENCODING, MEMORY USAGE
+const KEY_INFO_COMMANDS = 4;
+
+// Per-database clients kept open at once; the least recently used is closed beyond this
+const MAX_DATABASE_CLIENTS = 16;
+
+// How long the parsed database list is reused; writes made through this server clear it
+// sooner, so the TTL only bounds staleness from other clients
+const DATABASES_CACHE_TTL_MS = 10000;
+
+// Commands that never change the keyspace; any other command invalidates cached INFO
+// output and the parsed database list
+const READ_ONLY_COMMANDS = new Set([
+  'DBSIZE',
+  'EXISTS',
+  'GET',
+  'HEXISTS',
+  'HGET',
+  'HGETALL',
+  'HLEN',
+  'HMGET',
+  'INFO',
+  'KEYS',
+  'LLEN',
+  'LRANGE',
+  'MEMORY',
+  'MGET',
+  'OBJECT',
+  'PING',
+  'PTTL',
+  'SCAN',
+  'SCARD',
+  'SISMEMBER',
+  'SMEMBERS',
+  'STRLEN',
+  'TTL',
+  'TYPE',
+  'ZCARD',
+  'ZRANGE',
+  'ZSCORE',
+]);
+
+// Lines of INFO keyspace look like "db0:keys=12,expires=0,avg_ttl=0"
+const KEYSPACE_LINE_PATTERN = /^db(\d+):keys=(\d+)/gm;
+
+// Reads a key's type and whole value in one round trip, returning {type, value}.
+// Keys of a type the script does not read come back as {type} alone.
+const GET_VALUE_SCRIPT = `
+local t = redis.call('TYPE', KEYS[1])['ok']
+if t == 'string' then return {t, redis.call('GET', KEYS[1])}
+elseif t == 'list' then return {t, redis.call('LRANGE', KEYS[1], 0, -1)}
+elseif t == 'set' then return {t, redis.call('SMEMBERS', KEYS[1])}
+elseif t == 'zset' then return {t, redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')}
+elseif t == 'hash' then return {t, redis.call('HGETALL', KEYS[1])}
+end
+return {t}
+`;
+
+declare module 'ioredis' {
+  interface RedisCommander<Context> {
+    mcpGetValue(key: string): Result<[string, unknown?], Context>;
+  }
+}
+
+// Pipeline replies for one key in getKeysInfo, in KEY_INFO_COMMANDS order
+type KeyInfoReplies = [
+  [Error | null, string],
+  [Error | null, number],
+  [Error | null, string | null],
+  [Error | null, number | null],
+];
+
+/**
+ * Turn a flat [field, value, ...] reply into an object, as HGETALL does in ioredis
+ */
+function pairsToObject(pairs: string[]): Record<string, string> {
+  const record: Record<string, string> = {};
+  for (let i = 0; i + 1 < pairs.length; i += 2) {
+    record[pairs[i]!] = pairs[i + 1]!;
+  }
+  return record;
+}
+
+// Converts the raw script reply for each supported type into the value returned to callers
+const VALUE_DECODERS: Record<string, (raw: unknown) => unknown> = {
+  string: raw => raw,
+  list: raw => raw,
+  set: raw => raw,
+  zset: raw => raw,
+  hash: raw => pairsToObject(raw as string[]),
+  none: () => null,
+};
+
+// Commands that change connection state (transactions, subscriptions, protocol, auth),
+// which would leak into every session sharing the client
+const CONNECTION_STATE_COMMANDS = new Set([
+  'MULTI',
+  'EXEC',
+  'DISCARD',
+  'WATCH',
+  'UNWATCH',
+  'SUBSCRIBE',
+  'PSUBSCRIBE',
+  'SSUBSCRIBE',
+  'UNSUBSCRIBE',
+  'PUNSUBSCRIBE',
+  'SUNSUBSCRIBE',
+  'MONITOR',
+  'RESET',
+  'QUIT',
+  'HELLO',
+  'AUTH',
+  'READONLY',
+  'READWRITE',
+  'ASKING',
+]);
+
+// Commands that block the connection, stalling every other session's commands behind them
+const BLOCKING_COMMANDS = new Set([
+  'BLPOP',
+  'BRPOP',
+  'BRPOPLPUSH',
+  'BLMOVE',
+  'BLMPOP',
+  'BZPOPMIN',
+  'BZPOPMAX',
+  'BZMPOP',
+  'WAIT',
+  'WAITAOF',
+]);
+
+// CLIENT subcommands that change the calling connection
+const CLIENT_STATE_SUBCOMMANDS = new Set([
+  'REPLY',
+  'SETNAME',
+  'SETINFO',
+  'TRACKING',
+  'CACHING',
+  'NO-EVICT',
+  'NO-TOUCH',
+]);
+
+/**
+ * Reject commands that would change or block a client shared by every session:
+ * SELECT, transactions, subscriptions, MONITOR, blocking reads and the like
+ */
+export function assertSharedClientSafe(commands: string[][]): void {
+  for (const [command = '', ...args] of commands) {
+    const name = command.toUpperCase();
+    if (name === 'SELECT') {
+      throw new Error('SELECT is not supported; pass the database argument instead');
+    }
+
+    const streamBlock =
+      (name === 'XREAD' || name === 'XREADGROUP') &&
+      args.some(arg => arg.toUpperCase() === 'BLOCK');
+    const clientState =
+      name === 'CLIENT' && CLIENT_STATE_SUBCOMMANDS.has(args[0]?.toUpperCase() ?? '');
+    const blocking = BLOCKING_COMMANDS.has(name) || streamBlock;
+
+    if (blocking || clientState || CONNECTION_STATE_COMMANDS.has(name)) {
+      const label = streamBlock
+        ? `${name} BLOCK`
+        : clientState
+          ? `CLIENT ${args[0]!.toUpperCase()}`
+          : name;
+      const effect = blocking ? 'block' : 'change the state of';
+      throw new Error(
+        `${label} is not supported: it would ${effect} a connection shared between sessions`
+      );
+    }
+  }
+}
+
+export class RedisManager {
+  private readonly client: Redis;
+  // Least recently used first; a pending entry is dropped again if its SELECT fails
+  private readonly dbClients = new Map<number, Promise<Redis>>();
+  private readonly infoCache = new TtlCache<string, string>(INFO_CACHE_TTL_MS);
+  private readonly databasesCache = new TtlCache<string, RedisDatabaseSummary[]>(
+    DATABASES_CACHE_TTL_MS
+  );
+  // Keyed by "<database>:<key>"
+  private readonly valueCache = new TtlCache<string, unknown>(KEY_CACHE_TTL_MS, KEY_CACHE_SIZE);
+  private readonly keyInfoCache = new TtlCache<string, RedisKeyInfo>(
+    KEY_CACHE_TTL_MS,
+    KEY_CACHE_SIZE
+  );
+
+  // Database selected by the connection URL, used when a command names no database
+  readonly defaultDatabase: number;
+
+  constructor(client: Redis) {
+    this.client = client;
+    this.defaultDatabase = client.options.db ?? 0;
+  }
+
+  /**
+   * Get the long-lived client bound to a logical database, creating it on first use.
+   *
+   * These clients are shared by every session, which is why arbitrary commands may not
+   * SELECT another database on them. At most MAX_DATABASE_CLIENTS stay open; the least
+   * recently used is closed to make room.
+   */
+  async clientFor(database: number): Promise<Redis> {
+    if (!Number.isInteger(database) || database < 0) {
+      throw new Error(`Invalid Redis database ${database}: expected a non-negative integer`);
+    }
+
+    const cached = this.dbClients.get(database);
+    if (cached) {
+      this.dbClients.delete(database);
+      this.dbClients.set(database, cached);
+      return cached;
+    }
+
+    const pending = this.connectDatabase(database);
+    this.dbClients.set(database, pending);
+    pending.then(
+      () => this.evictDatabaseClients(),
+      () => {
+        if (this.dbClients.get(database) === pending) {
+          this.dbClients.delete(database);
+        }
+      }
+    );
+    return pending;
+  }
+
+  /**
+   * Close the least recently used per-database clients beyond MAX_DATABASE_CLIENTS
+   */
+  private evictDatabaseClients(): void {
+    for (const [database, client] of this.dbClients) {
+      if (this.dbClients.size <= MAX_DATABASE_CLIENTS) {
+        break;
+      }
+      this.dbClients.delete(database);
+      // QUIT runs after any commands already queued on the client
+      client.then(evicted => evicted.quit()).catch(() => undefined);
+    }
+  }
+
+  /**
+   * Open a client on a database, failing if the server refuses to select it.
+   *
+   * ioredis only emits an error when the SELECT it sends on connect fails and leaves the
+   * connection on database 0, so the database is selected again here and awaited.
+   */
+  private async connectDatabase(database: number): Promise<Redis> {
+    const client = this.client.duplicate({ db: database });
+    client.defineCommand('mcpGetValue', { numberOfKeys: 1, lua: GET_VALUE_SCRIPT });
+    try {
+      await client.select(database);
+    } catch (error) {
+      client.disconnect();
+      throw error;
+    }
+    return client;
+  }
+
+  /**
+   * Run an arbitrary command against a database
+   */
+  async executeCommand(
+    command: string,
+    args: string[] = [],
+    database: number = this.defaultDatabase
+  ): Promise<unknown> {
+    assertSharedClientSafe([[command, ...args]]);
+    const client = await this.clientFor(database);
+    const result = await client.call(command, ...args);
+    this.invalidateFor([command]);
+    return result;
+  }
+
+  /**
+   * Run a batch of commands against a database in a single round trip.
+   *
+   * The pipeline is not a transaction: each command succeeds or fails on its own,
+   * and a failed command is reported in place as `{ error }`.
+   */
+  async executePipeline(
+    commands: string[][],
+    database: number = this.defaultDatabase
+  ): Promise<unknown[]> {
+    assertSharedClientSafe(commands);
+    const names = commands.map(([command]) => command!);
+
+    const client = await this.clientFor(database);
+    const pipeline = client.pipeline();
+    for (const [command, ...args] of commands) {
+      pipeline.call(command!, ...args);
+    }
+
+    const results = await pipeline.exec();
+    if (!results) {
+      throw new Error('Redis pipeline was aborted');
+    }
+
+    this.invalidateFor(names);
+    return results.map(([error, result]) => (error ? { error: error.message } : result));
+  }
+
+  /**
+   * Get INFO output for a section, reusing a response fetched in the last few seconds
+   */
+  async getInfo(section: string = 'default'): Promise<string> {
+    const cached = this.infoCache.get(section);
+    if (cached !== undefined) {
+      return cached;
+    }
+
+    const info = await this.client.info(section);
+    this.infoCache.set(section, info);
+    return info;
+  }
+
+  /**
+   * List databases holding keys, parsed from the INFO keyspace section.
+   *
+   * The parsed list is reused until it expires or a write command invalidates it.
+   */
+  async getDatabases(): Promise<RedisDatabaseSummary[]> {
+    const cached = this.databasesCache.get('keyspace');
+    if (cached !== undefined) {
+      return cached;
+    }
+
+    const keyspace = await this.getInfo('keyspace');
+    const databases = Array.from(keyspace.matchAll(KEYSPACE_LINE_PATTERN), match => ({
+      database: Number(match[1]),
+      keys: Number(match[2]),
+    }));
+    this.databasesCache.set('keyspace', databases);
+    return databases;
+  }
+
+  /**
+   * Run a command against a specific database in a single round trip
+   */
+  async commandOnDb(database: number, command: string, ...args: string[]): Promise<unknown> {
+    const client = await this.clientFor(database);
+    const result = await client.call(command, ...args);
+    this.invalidateFor([command]);
+    return result;
+  }
+
+  /**
+   * List keys matching a pattern in a database.
+   *
+   * Iterates with SCAN so the server is never blocked on the whole keyspace, and
+   * stops issuing further SCAN calls once `limit` keys have been collected. `count`
+   * is the initial SCAN COUNT hint: how much of the keyspace each call walks. SCAN
+   * cursors are sequential and cannot be pipelined, so round trips are cut instead by
+   * doubling the hint (up to MAX_SCAN_COUNT) after every call that matched nothing, and
+   * by answering a pattern without wildcards with a single EXISTS.
+   */
+  async getKeys(
+    database: number,
+    pattern: string = '*',
+    limit?: number | undefined,
+    count: number = SCAN_COUNT
+  ): Promise<string[]> {
+    const client = await this.clientFor(database);
+    if (!GLOB_PATTERN.test(pattern)) {
+      return (await client.exists(pattern)) > 0 ? [pattern] : [];
+    }
+
+    // SCAN may return a key more than once while the keyspace is rehashing
+    const keys = new Set<string>();
+    let cursor = '0';
+    let scanCount = count;
+
+    do {
+      const [nextCursor, batch] = await client.scan(cursor, 'MATCH', pattern, 'COUNT', scanCount);
+      cursor = nextCursor;
+      for (const key of batch) {
+        keys.add(key);
+      }
+      if (batch.length === 0 && scanCount < MAX_SCAN_COUNT) {
+        scanCount = Math.min(scanCount * 2, MAX_SCAN_COUNT);
+      }
+    } while (cursor !== '0' && (limit === undefined || keys.size < limit));
+
+    const result = Array.from(keys);
+    return limit === undefined ? result : result.slice(0, limit);
+  }
+
+  /**
+   * Get type, TTL, encoding and memory usage for a key in a single pipelined round trip.
+   *
+   * Results are reused for a few seconds, until a write made through this manager.
+   */
+  async getKeyInfo(database: number, key: string): Promise<RedisKeyInfo> {
+    const [info] = await this.getKeysInfo(database, [key]);
+    return info!;
+  }
+
+  /**
+   * Get metadata for several keys, fetching every uncached key in one pipelined round trip
+   */
+  async getKeysInfo(database: number, keys: string[]): Promise<RedisKeyInfo[]> {
+    const infos = keys.map(key => this.keyInfoCache.get(`${database}:${key}`));
+    const missing = keys.filter((_key, index) => infos[index] === undefined);
+    if (missing.length === 0) {
+      return infos as RedisKeyInfo[];
+    }
+
+    const client = await this.clientFor(database);
+    const pipeline = client.pipeline();
+    for (const key of missing) {
+      pipeline.type(key).ttl(key).call('OBJECT', 'ENCODING', key).call('MEMORY', 'USAGE', key);
+    }
+    const results = await pipeline.exec();
+    if (!results) {
+      throw new Error('Redis key info pipeline was aborted');
+    }
+
+    const fetched = new Map<string, RedisKeyInfo>();
+    missing.forEach((key, index) => {
+      const offset = index * KEY_INFO_COMMANDS;
+      const replies = results.slice(offset, offset + KEY_INFO_COMMANDS) as KeyInfoReplies;
+      const [[typeError, type], [ttlError, ttl]] = replies;
+      const [, , [encodingError, encoding], [memoryError, memory]] = replies;
+      if (typeError || ttlError) {
+        throw typeError ?? ttlError;
+      }
+
+      // OBJECT ENCODING fails for missing keys, and MEMORY USAGE is unavailable on some
+      // servers and managed offerings
+      const info = {
+        key,
+        type,
+        ttl,
+        encoding: encodingError ? null : encoding,
+        memory_usage: memoryError ? null : memory,
+      };
+      this.keyInfoCache.set(`${database}:${key}`, info);
+      fetched.set(key, info);
+    });
+
+    return keys.map((key, index) => infos[index] ?? fetched.get(key)!);
+  }
+
+  /**
+   * Get the values of several string keys with one MGET.
+   *
+   * Keys that are missing or hold a non-string type map to null.
+   */
+  async getValues(database: number, keys: string[]): Promise<Record<string, string | null>> {
+    const client = await this.clientFor(database);
+    const values = await client.mget(...keys);
+    const result: Record<string, string | null> = {};
+    for (let i = 0; i < keys.length; i++) {
+      result[keys[i]!] = values[i] ?? null;
+    }
+    return result;
+  }
+
+  /**
+   * Get the value of a key, reading it with the command matching its type.
+   *
+   * The type check and the read run server-side in one script, so this costs a
+   * single round trip (EVALSHA, falling back to EVAL the first time). Values are
+   * reused for a few seconds, until a write made through this manager.
+   */
+  async getValue(database: number, key: string): Promise<unknown> {
+    const cacheKey = `${database}:${key}`;
+    const cached = this.valueCache.get(cacheKey);
+    if (cached !== undefined) {
+      return cached;
+    }
+
+    const client = await this.clientFor(database);
+    const [type, raw] = await client.mcpGetValue(key);
+
+    const decode = VALUE_DECODERS[type];
+    if (!decode) {
+      throw new Error(`Unsupported Redis type '${type}' for key '${key}'`);
+    }
+    const value = decode(raw);
+    this.valueCache.set(cacheKey, value);
+    return value;
+  }
+
+  /**
+   * Drop every cached read if any command may have changed the keyspace
+   */
+  private invalidateFor(commands: string[]): void {
+    if (commands.some(command => !READ_ONLY_COMMANDS.has(command.toUpperCase()))) {
+      this.infoCache.clear();
+      this.databasesCache.clear();
+      this.valueCache.clear();
+      this.keyInfoCache.clear();
+    }
+  }
+
+  /**
+   * Close the shared connection and every per-database client
+   */
+  disconnect(): void {
+    this.client.disconnect();
+    for (const client of this.dbClients.values()) {
+      client.then(open => open.disconnect()).catch(() => undefined);
+    }
+    this.dbClients.clear();
+  }
+}
@@ -11,47 +11,129 @@ import { registerPostgresTools } from './tools/postgres.js';
 import { registerRedisTools } from './tools/redis.js';
 import { registerMongoTools } from './tools/mongodb.js';
 import { registerInfluxTools } from './tools/influxdb.js';
+import { registerDatabaseTools } from './tools/databases.js';
 import { registerDatabaseResources } from './resources/index.js';
 
+type RequestHandler = (request: unknown, extra: unknown) => unknown;
+
+// List methods whose results depend only on the configuration, never on the request or session
+const STATIC_LIST_METHODS = ['tools/list', 'resources/list', 'resources/templates/list'];
+
+/**
+ * A list result shared by every session, plus its JSON once it has resolved
+ */
+interface CachedListResult {
+  result: Promise<unknown>;
+  json?: string;
+}
+
+// List results built by the first session for a configuration and reused by every later one
+const listResultCache = new WeakMap<DatabaseConfig, Map<string, CachedListResult>>();
+
+/**
+ * Serve list requests from a cache shared across sessions.
+ *
+ * The SDK rebuilds these responses on every call, converting each tool's zod schema
+ * to JSON Schema, although the registered capabilities never change after startup.
+ */
+function cacheListResponses(server: McpServer, config: DatabaseConfig): void {
+  let results = listResultCache.get(config);
+  if (!results) {
+    results = new Map();
+    listResultCache.set(config, results);
+  }
+  const cache = results;
+
+  // The SDK has no accessor for installed handlers; they live on a private protocol field,
+  // so a release that reshapes it only turns caching off rather than failing startup
+  const field = (server.server as unknown as { _requestHandlers?: unknown })._requestHandlers;
+  if (!(field instanceof Map)) {
+    console.error('⚠️  List responses not cached - SDK request handlers not found');
+    return;
+  }
+  const handlers = field as Map<string, unknown>;
+
+  for (const method of STATIC_LIST_METHODS) {
+    const handler = handlers.get(method);
+    if (typeof handler !== 'function') {
+      console.error(`⚠️  ${method} responses not cached - no SDK handler installed`);
+      continue;
+    }
+
+    handlers.set(method, (request: unknown, extra: unknown) => {
+      let cached = cache.get(method);
+      if (!cached) {
+        // Some SDK list handlers are synchronous
+        const entry: CachedListResult = {
+          result: Promise.resolve().then(() => (handler as RequestHandler)(request, extra)),
+        };
+        entry.result.then(
+          result => {
+            entry.json = JSON.stringify(result);
+          },
+          // Failures are not cached
+          () => cache.delete(method)
+        );
+        cache.set(method, entry);
+        cached = entry;
+      }
+      return cached.result;
+    });
+  }
+}
+
 /**
- * Register all tools and resources with the MCP server
+ * Serialized result of a list method, once a session has computed it for this configuration
+ */
+export function cachedListResultJson(config: DatabaseConfig, method: string): string | undefined {
+  return listResultCache.get(config)?.get(method)?.json;
+}
+
+/**
+ * Register all tools and resources with the MCP server.
+ *
+ * Handlers are bound to the session identified by `sessionId`, so every call made
+ * through this server uses that session's database clients.
  */
 export function registerAllCapabilities(
   server: McpServer,
   config: DatabaseConfig,
-  sessions: Map<string, DatabaseSession>
+  sessions: Map<string, DatabaseSession>,
+  sessionId: string = 'default'
 ): void {
   console.error('📋 Registering database tools and resources...');
 
   // Register PostgreSQL tools (primary database, always enabled)
-  registerPostgresTools(server, config, sessions);
+  registerPostgresTools(server, config, sessions, sessionId);
 
   // Register Redis tools if enabled in config
   if (config.redis?.enabled) {
-    registerRedisTools(server, config, sessions);
+    registerRedisTools(server, config, sessions, sessionId);
   } else {
     console.error('⚠️  Redis tools not registered - Redis not enabled in config');
   }
 
   // Register MongoDB tools if enabled in config
   if (config.mongodb?.enabled) {
-    registerMongoTools(server, config, sessions);
+    registerMongoTools(server, config, sessions, sessionId);
   } else {
     console.error('⚠️  MongoDB tools not registered - MongoDB not enabled in config');
   }
 
   // Register InfluxDB tools if enabled in config
   if (config.influxdb?.enabled) {
-    registerInfluxTools(server, config, sessions);
+    registerInfluxTools(server, config, sessions, sessionId);
   } else {
     console.error('⚠️  InfluxDB tools not registered - InfluxDB not enabled in config');
   }
 
-  // TODO: Register resources when implemented
-  // registerDatabaseResources(server, config, sessions);
+  // Register tools that span every enabled backend
+  registerDatabaseTools(server, config, sessions, sessionId);
 
   // Register database resources
-  registerDatabaseResources(server, config, sessions);
+  registerDatabaseResources(server, config, sessions, sessionId);
+
+  cacheListResponses(server, config);
 
   console.error('✅ All database capabilities registered');
 }
@@ -6,11 +6,29 @@
  */
 
 import { McpServer } from '@modelcontextprotocol/sdk/server/mcp.js';
-import { DatabaseSession, DatabaseConfig, getOrCreateSession } from '../types/session.js';
+import {
+  DatabaseSession,
+  DatabaseConfig,
+  parseConnectionUrl,
+  sessionResolver,
+} from '../types/session.js';
 import { registerPostgresResources } from './postgres.js';
 import { registerRedisResources } from './redis.js';
 import { registerMongoResources } from './mongodb.js';
 import { registerInfluxResources } from './influxdb.js';
+import { errorMessage, jsonResource } from '../utils/format.js';
+
+/**
+ * Run a health check, reporting failure instead of throwing
+ */
+async function reachable(check: () => Promise<unknown>): Promise<boolean> {
+  try {
+    await check();
+    return true;
+  } catch {
+    return false;
+  }
+}
 
 /**
  * Register all database resources with the MCP server
@@ -18,26 +36,32 @@ import { registerInfluxResources } from './influxdb.js';
 export function registerDatabaseResources(
   server: McpServer,
   config: DatabaseConfig,
-  sessions: Map<string, DatabaseSession>
+  sessions: Map<string, DatabaseSession>,
+  sessionId: string = 'default'
 ): void {
   console.error('📚 Registering database resources...');
 
+  const getSession = sessionResolver(sessionId, config, sessions);
+
+  // The connection URL never changes at runtime, so it is parsed once here
+  const postgresUrl = parseConnectionUrl(config.postgres.url);
+
   // Register PostgreSQL resources (primary database, always enabled)
-  registerPostgresResources(server, config, sessions);
+  registerPostgresResources(server, config, sessions, sessionId);
 
   // Register Redis resources if enabled in config
   if (config.redis?.enabled) {
-    registerRedisResources(server, config, sessions);
+    registerRedisResources(server, config, sessions, sessionId);
   }
 
   // Register MongoDB resources if enabled in config
   if (config.mongodb?.enabled) {
-    registerMongoResources(server, config, sessions);
+    registerMongoResources(server, config, sessions, sessionId);
   }
 
   // Register InfluxDB resources if enabled in config
   if (config.influxdb?.enabled) {
-    registerInfluxResources(server, config, sessions);
+    registerInfluxResources(server, config, sessions, sessionId);
   }
 
   // ========== GENERAL RESOURCES ==========
@@ -53,21 +77,30 @@ export function registerDatabaseResources(
     },
     async (uri: URL) => {
       try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
+        const session = await getSession();
+        const { postgres, redis, mongodb } = session.clients;
+
+        // Every backend is checked concurrently, so the slowest one bounds the latency
+        const [postgresDatabases, redisReachable, mongodbReachable] = await Promise.all([
+          postgres ? postgres.ping() : null,
+          redis ? reachable(() => redis.executeCommand('PING')) : null,
+          mongodb ? reachable(() => mongodb.db('admin').command({ ping: 1 })) : null,
+        ]);
 
         const status = {
           postgres: {
             enabled: true,
-            connected: !!session.clients.postgres,
+            connected: !!postgres,
+            databases: postgresDatabases,
             config: {
-              host: config.postgres.url ? new URL(config.postgres.url).hostname : 'localhost',
-              port: config.postgres.url ? new URL(config.postgres.url).port : '5432',
+              host: postgresUrl ? postgresUrl.hostname : 'localhost',
+              port: postgresUrl ? postgresUrl.port : '5432',
             },
           },
           redis: {
             enabled: !!config.redis?.enabled,
-            connected: !!session.clients.redis,
+            connected: !!redis,
+            reachable: redisReachable,
             config: config.redis?.enabled
               ? {
                   url: config.redis.url || 'redis://localhost:6379',
@@ -76,7 +109,8 @@ export function registerDatabaseResources(
           },
           mongodb: {
             enabled: !!config.mongodb?.enabled,
-            connected: !!session.clients.mongodb,
+            connected: !!mongodb,
+            reachable: mongodbReachable,
             config: config.mongodb?.enabled
               ? {
                   url: config.mongodb.url || 'mongodb://localhost:27017',
@@ -96,31 +130,11 @@ export function registerDatabaseResources(
           },
         };
 
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify({ status }, null, 2),
-            },
-          ],
-        };
+        return jsonResource(uri, { status });
       } catch (error) {
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify(
-                {
-                  error: `Failed to get connection status: ${error instanceof Error ? error.message : 'Unknown error'}`,
-                },
-                null,
-                2
-              ),
-            },
-          ],
-        };
+        return jsonResource(uri, {
+          error: `Failed to get connection status: ${errorMessage(error)}`,
+        });
       }
     }
   );
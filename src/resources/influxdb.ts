@@ -4,15 +4,22 @@
  */
 
 import { McpServer } from '@modelcontextprotocol/sdk/server/mcp.js';
-import { DatabaseSession, DatabaseConfig, getOrCreateSession } from '../types/session.js';
+import { DatabaseSession, DatabaseConfig, sessionResolver } from '../types/session.js';
+import { errorMessage, jsonResource } from '../utils/format.js';
+
+const INFLUXDB_DISABLED =
+  'InfluxDB is disabled. Please enable it in configuration to use this resource.';
 
 export function registerInfluxResources(
   server: McpServer,
   config: DatabaseConfig,
-  sessions: Map<string, DatabaseSession>
+  sessions: Map<string, DatabaseSession>,
+  sessionId: string = 'default'
 ): void {
   console.error('📈 Registering InfluxDB resources...');
 
+  const getSession = sessionResolver(sessionId, config, sessions);
+
   // InfluxDB server information
   server.registerResource(
     'influxdb-info',
@@ -24,26 +31,10 @@ export function registerInfluxResources(
     },
     async (uri: URL) => {
       try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
+        const session = await getSession();
 
         if (!session.clients.influxdb || !config.influxdb?.org) {
-          return {
-            contents: [
-              {
-                uri: uri.href,
-                mimeType: 'application/json',
-                text: JSON.stringify(
-                  {
-                    error:
-                      'InfluxDB is disabled. Please enable it in configuration to use this resource.',
-                  },
-                  null,
-                  2
-                ),
-              },
-            ],
-          };
+          return jsonResource(uri, { error: INFLUXDB_DISABLED });
         }
 
         // Get basic server information
@@ -54,31 +45,11 @@ export function registerInfluxResources(
           url: config.influxdb.url,
         };
 
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify({ server_info: info }, null, 2),
-            },
-          ],
-        };
+        return jsonResource(uri, { server_info: info });
       } catch (error) {
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify(
-                {
-                  error: `Failed to get InfluxDB server info: ${error instanceof Error ? error.message : 'Unknown error'}`,
-                },
-                null,
-                2
-              ),
-            },
-          ],
-        };
+        return jsonResource(uri, {
+          error: `Failed to get InfluxDB server info: ${errorMessage(error)}`,
+        });
       }
     }
   );
@@ -94,56 +65,20 @@ export function registerInfluxResources(
     },
     async (uri: URL) => {
       try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
+        const session = await getSession();
 
         if (!session.clients.influxdb || !config.influxdb?.org) {
-          return {
-            contents: [
-              {
-                uri: uri.href,
-                mimeType: 'application/json',
-                text: JSON.stringify(
-                  {
-                    error:
-                      'InfluxDB is disabled. Please enable it in configuration to use this resource.',
-                  },
-                  null,
-                  2
-                ),
-              },
-            ],
-          };
+          return jsonResource(uri, { error: INFLUXDB_DISABLED });
         }
 
         // For now, return the configured bucket since the buckets API may not be easily accessible
         const buckets = [config.influxdb.bucket].filter(Boolean);
 
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify({ buckets }, null, 2),
-            },
-          ],
-        };
+        return jsonResource(uri, { buckets });
       } catch (error) {
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify(
-                {
-                  error: `Failed to list InfluxDB buckets: ${error instanceof Error ? error.message : 'Unknown error'}`,
-                },
-                null,
-                2
-              ),
-            },
-          ],
-        };
+        return jsonResource(uri, {
+          error: `Failed to list InfluxDB buckets: ${errorMessage(error)}`,
+        });
       }
     }
   );
@@ -4,15 +4,36 @@
  */
 
 import { McpServer } from '@modelcontextprotocol/sdk/server/mcp.js';
-import { DatabaseSession, DatabaseConfig, getOrCreateSession } from '../types/session.js';
+import { DatabaseSession, DatabaseConfig, sessionResolver } from '../types/session.js';
+import type { Document, MongoClient } from 'mongodb';
+import { errorMessage, jsonResource } from '../utils/format.js';
+
+const MONGODB_DISABLED = 'MongoDB is disabled in the server configuration';
+
+// buildInfo does not change while a client stays connected, so it is fetched once per client
+const serverInfoCache = new WeakMap<MongoClient, Promise<Document>>();
+
+function serverInfo(client: MongoClient): Promise<Document> {
+  let info = serverInfoCache.get(client);
+  if (!info) {
+    info = client.db('admin').admin().serverInfo();
+    // Failures are not cached
+    info.catch(() => serverInfoCache.delete(client));
+    serverInfoCache.set(client, info);
+  }
+  return info;
+}
 
 export function registerMongoResources(
   server: McpServer,
   config: DatabaseConfig,
-  sessions: Map<string, DatabaseSession>
+  sessions: Map<string, DatabaseSession>,
+  sessionId: string = 'default'
 ): void {
   console.error('🍃 Registering MongoDB resources...');
 
+  const getSession = sessionResolver(sessionId, config, sessions);
+
   // MongoDB server information
   server.registerResource(
     'mongodb-info',
@@ -24,53 +45,19 @@ export function registerMongoResources(
     },
     async (uri: URL) => {
       try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
+        const session = await getSession();
 
         if (!session.clients.mongodb) {
-          return {
-            contents: [
-              {
-                uri: uri.href,
-                mimeType: 'application/json',
-                text: JSON.stringify(
-                  { error: 'MongoDB is disabled in the server configuration' },
-                  null,
-                  2
-                ),
-              },
-            ],
-          };
+          return jsonResource(uri, { error: MONGODB_DISABLED });
         }
 
-        const admin = session.clients.mongodb.db('admin');
-        const info = await admin.admin().serverInfo();
+        const info = await serverInfo(session.clients.mongodb);
 
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify({ server_info: info }, null, 2),
-            },
-          ],
-        };
+        return jsonResource(uri, { server_info: info });
       } catch (error) {
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify(
-                {
-                  error: `Failed to get MongoDB server info: ${error instanceof Error ? error.message : 'Unknown error'}`,
-                },
-                null,
-                2
-              ),
-            },
-          ],
-        };
+        return jsonResource(uri, {
+          error: `Failed to get MongoDB server info: ${errorMessage(error)}`,
+        });
       }
     }
   );
@@ -86,53 +73,20 @@ export function registerMongoResources(
     },
     async (uri: URL) => {
       try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
+        const session = await getSession();
 
         if (!session.clients.mongodb) {
-          return {
-            contents: [
-              {
-                uri: uri.href,
-                mimeType: 'application/json',
-                text: JSON.stringify(
-                  { error: 'MongoDB is disabled in the server configuration' },
-                  null,
-                  2
-                ),
-              },
-            ],
-          };
+          return jsonResource(uri, { error: MONGODB_DISABLED });
         }
 
         const admin = session.clients.mongodb.db('admin');
         const databases = await admin.admin().listDatabases();
 
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify({ databases: databases.databases }, null, 2),
-            },
-          ],
-        };
+        return jsonResource(uri, { databases: databases.databases });
       } catch (error) {
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify(
-                {
-                  error: `Failed to list MongoDB databases: ${error instanceof Error ? error.message : 'Unknown error'}`,
-                },
-                null,
-                2
-              ),
-            },
-          ],
-        };
+        return jsonResource(uri, {
+          error: `Failed to list MongoDB databases: ${errorMessage(error)}`,
+        });
       }
     }
   );
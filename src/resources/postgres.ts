@@ -4,15 +4,34 @@
  */
 
 import { McpServer } from '@modelcontextprotocol/sdk/server/mcp.js';
-import { DatabaseSession, DatabaseConfig, getOrCreateSession } from '../types/session.js';
+import {
+  DatabaseSession,
+  DatabaseConfig,
+  parseConnectionUrl,
+  sessionResolver,
+} from '../types/session.js';
+import { errorMessage, jsonResource } from '../utils/format.js';
+
+const POSTGRES_DISABLED = 'PostgreSQL is disabled in the server configuration';
 
 export function registerPostgresResources(
   server: McpServer,
   config: DatabaseConfig,
-  sessions: Map<string, DatabaseSession>
+  sessions: Map<string, DatabaseSession>,
+  sessionId: string = 'default'
 ): void {
   console.error('🐘 Registering PostgreSQL resources...');
 
+  const getSession = sessionResolver(sessionId, config, sessions);
+
+  // The connection URL never changes at runtime, so its details are read once here
+  const postgresUrl = parseConnectionUrl(config.postgres.url);
+  const connectionDetails = {
+    host: postgresUrl ? postgresUrl.hostname : 'localhost',
+    port: postgresUrl ? postgresUrl.port : '5432',
+    user: postgresUrl ? postgresUrl.username : 'postgres',
+  };
+
   // List all connected PostgreSQL databases
   server.registerResource(
     'postgres-databases',
@@ -24,56 +43,19 @@ export function registerPostgresResources(
     },
     async (uri: URL) => {
       try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
+        const session = await getSession();
 
         if (!session.clients.postgres) {
-          return {
-            contents: [
-              {
-                uri: uri.href,
-                mimeType: 'application/json',
-                text: JSON.stringify(
-                  { error: 'PostgreSQL is disabled in the server configuration' },
-                  null,
-                  2
-                ),
-              },
-            ],
-          };
+          return jsonResource(uri, { error: POSTGRES_DISABLED });
         }
 
-        // Get list of databases
-        const result = await session.clients.postgres.query(
-          'SELECT datname FROM pg_database WHERE datallowconn = true ORDER BY datname'
-        );
-        const databases = result.rows.map((row: any) => row.datname);
+        const databases = await session.clients.postgres.listDatabases();
 
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify({ databases }, null, 2),
-            },
-          ],
-        };
+        return jsonResource(uri, { databases });
       } catch (error) {
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify(
-                {
-                  error: `Failed to list PostgreSQL databases: ${error instanceof Error ? error.message : 'Unknown error'}`,
-                },
-                null,
-                2
-              ),
-            },
-          ],
-        };
+        return jsonResource(uri, {
+          error: `Failed to list PostgreSQL databases: ${errorMessage(error)}`,
+        });
       }
     }
   );
@@ -89,57 +71,23 @@ export function registerPostgresResources(
     },
     async (uri: URL) => {
       try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
+        const session = await getSession();
 
         if (!session.clients.postgres) {
-          return {
-            contents: [
-              {
-                uri: uri.href,
-                mimeType: 'application/json',
-                text: JSON.stringify(
-                  { error: 'PostgreSQL is disabled in the server configuration' },
-                  null,
-                  2
-                ),
-              },
-            ],
-          };
+          return jsonResource(uri, { error: POSTGRES_DISABLED });
         }
 
         const connectionInfo = {
-          host: config.postgres.url ? new URL(config.postgres.url).hostname : 'localhost',
-          port: config.postgres.url ? new URL(config.postgres.url).port : '5432',
-          user: config.postgres.url ? new URL(config.postgres.url).username : 'postgres',
+          ...connectionDetails,
           connected: true,
+          pools: session.clients.postgres.stats(),
         };
 
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify({ connection: connectionInfo }, null, 2),
-            },
-          ],
-        };
+        return jsonResource(uri, { connection: connectionInfo });
       } catch (error) {
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify(
-                {
-                  error: `Failed to get PostgreSQL connection info: ${error instanceof Error ? error.message : 'Unknown error'}`,
-                },
-                null,
-                2
-              ),
-            },
-          ],
-        };
+        return jsonResource(uri, {
+          error: `Failed to get PostgreSQL connection info: ${errorMessage(error)}`,
+        });
       }
     }
   );
@@ -3,16 +3,76 @@
  * Complete implementation matching Python version functionality
  */
 
-import { McpServer } from '@modelcontextprotocol/sdk/server/mcp.js';
-import { DatabaseSession, DatabaseConfig, getOrCreateSession } from '../types/session.js';
+import { McpServer, ResourceTemplate } from '@modelcontextprotocol/sdk/server/mcp.js';
+import { Variables } from '@modelcontextprotocol/sdk/shared/uriTemplate.js';
+import { DatabaseSession, DatabaseConfig, sessionResolver } from '../types/session.js';
+import { RedisKeyInfo, RedisManager } from '../managers/redis.js';
+import { errorMessage, jsonResource, jsonTextResource } from '../utils/format.js';
+
+const REDIS_DISABLED = 'Redis is disabled in the server configuration';
+
+// Upper bound on keys returned by the database keys resource
+const KEYS_RESOURCE_LIMIT = 1000;
+
+/**
+ * Read a single URI template variable
+ */
+function templateVariable(variables: Variables, name: string): string {
+  const value = variables[name];
+  return decodeURIComponent((Array.isArray(value) ? value[0] : value) ?? '');
+}
+
+/**
+ * Parse the {database} template variable into a Redis database number
+ */
+function templateDatabase(variables: Variables): number {
+  const database = Number(templateVariable(variables, 'database'));
+  if (!Number.isInteger(database) || database < 0) {
+    throw new Error(`Invalid Redis database '${templateVariable(variables, 'database')}'`);
+  }
+  return database;
+}
+
+// The key resources have fixed shapes, so their envelopes are written as templates
+// around the variable parts and only the payloads go through JSON.stringify
+
+/**
+ * Encode a database key listing
+ */
+function encodeKeys(database: number, keys: string[], truncated: boolean): string {
+  return `{"database":${database},"keys":${JSON.stringify(keys)},"truncated":${truncated}}`;
+}
+
+/**
+ * Encode metadata for a single key
+ */
+function encodeKeyInfo(database: number, info: RedisKeyInfo): string {
+  return `{"database":${database},"key_info":${JSON.stringify(info)}}`;
+}
+
+/**
+ * Encode the value of a single key
+ */
+function encodeKeyValue(database: number, key: string, value: unknown): string {
+  return `{"database":${database},"key":${JSON.stringify(key)},"value":${JSON.stringify(value)}}`;
+}
 
 export function registerRedisResources(
   server: McpServer,
   config: DatabaseConfig,
-  sessions: Map<string, DatabaseSession>
+  sessions: Map<string, DatabaseSession>,
+  sessionId: string = 'default'
 ): void {
   console.error('🔴 Registering Redis resources...');
 
+  const getSession = sessionResolver(sessionId, config, sessions);
+
+  // Resolve the session's Redis manager, or undefined when Redis is not connected
+  async function getRedisManager(): Promise<RedisManager | undefined> {
+    const session = await getSession();
+    return session.clients.redis;
+  }
+
   // Redis server information
   server.registerResource(
     'redis-info',
@@ -24,52 +84,16 @@ export function registerRedisResources(
     },
     async (uri: URL) => {
       try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.redis) {
-          return {
-            contents: [
-              {
-                uri: uri.href,
-                mimeType: 'application/json',
-                text: JSON.stringify(
-                  { error: 'Redis is disabled in the server configuration' },
-                  null,
-                  2
-                ),
-              },
-            ],
-          };
+        const redis = await getRedisManager();
+        if (!redis) {
+          return jsonResource(uri, { error: REDIS_DISABLED });
         }
 
-        const info = await session.clients.redis.info();
-
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify({ server_info: info }, null, 2),
-            },
-          ],
-        };
+        const info = await redis.getInfo();
+
+        return jsonResource(uri, { server_info: info });
       } catch (error) {
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify(
-                {
-                  error: `Failed to get Redis info: ${error instanceof Error ? error.message : 'Unknown error'}`,
-                },
-                null,
-                2
-              ),
-            },
-          ],
-        };
+        return jsonResource(uri, { error: `Failed to get Redis info: ${errorMessage(error)}` });
       }
     }
   );
@@ -85,64 +109,110 @@ export function registerRedisResources(
     },
     async (uri: URL) => {
       try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.redis) {
-          return {
-            contents: [
-              {
-                uri: uri.href,
-                mimeType: 'application/json',
-                text: JSON.stringify(
-                  { error: 'Redis is disabled in the server configuration' },
-                  null,
-                  2
-                ),
-              },
-            ],
-          };
+        const redis = await getRedisManager();
+        if (!redis) {
+          return jsonResource(uri, { error: REDIS_DISABLED });
+        }
+
+        const databases = await redis.getDatabases();
+
+        return jsonResource(uri, { databases });
+      } catch (error) {
+        return jsonResource(uri, {
+          error: `Failed to list Redis databases: ${errorMessage(error)}`,
+        });
+      }
+    }
+  );
+
+  // Keys in a Redis database
+  server.registerResource(
+    'redis-database-keys',
+    new ResourceTemplate('redis://{database}/keys', { list: undefined }),
+    {
+      name: 'Redis Database Keys',
+      description: `List keys in a Redis database (up to ${KEYS_RESOURCE_LIMIT})`,
+      mimeType: 'application/json',
+    },
+    async (uri: URL, variables: Variables) => {
+      try {
+        const redis = await getRedisManager();
+        if (!redis) {
+          return jsonResource(uri, { error: REDIS_DISABLED });
+        }
+
+        const database = templateDatabase(variables);
+        const keys = await redis.getKeys(database, '*', KEYS_RESOURCE_LIMIT + 1);
+
+        return jsonTextResource(
+          uri,
+          encodeKeys(
+            database,
+            keys.slice(0, KEYS_RESOURCE_LIMIT),
+            keys.length > KEYS_RESOURCE_LIMIT
+          )
+        );
+      } catch (error) {
+        return jsonResource(uri, {
+          error: `Failed to list Redis keys: ${errorMessage(error)}`,
+        });
+      }
+    }
+  );
+
+  // Metadata for a single Redis key
+  server.registerResource(
+    'redis-key-info',
+    new ResourceTemplate('redis://{database}/keys/{key}/info', { list: undefined }),
+    {
+      name: 'Redis Key Info',
+      description: 'Get type, TTL, encoding and memory usage of a Redis key',
+      mimeType: 'application/json',
+    },
+    async (uri: URL, variables: Variables) => {
+      try {
+        const redis = await getRedisManager();
+        if (!redis) {
+          return jsonResource(uri, { error: REDIS_DISABLED });
         }
 
-        // Check databases 0-15 for keys
-        const databases = [];
-        for (let i = 0; i < 16; i++) {
-          try {
-            await session.clients.redis.select(i);
-            const dbsize = await session.clients.redis.dbsize();
-            if (dbsize > 0) {
-              databases.push({ database: i, keys: dbsize });
-            }
-          } catch (error) {
-            // Skip databases that don't exist or can't be accessed
-          }
+        const database = templateDatabase(variables);
+        const info = await redis.getKeyInfo(database, templateVariable(variables, 'key'));
+
+        return jsonTextResource(uri, encodeKeyInfo(database, info));
+      } catch (error) {
+        return jsonResource(uri, {
+          error: `Failed to get Redis key info: ${errorMessage(error)}`,
+        });
+      }
+    }
+  );
+
+  // Value of a single Redis key
+  server.registerResource(
+    'redis-key-value',
+    new ResourceTemplate('redis://{database}/keys/{key}/value', { list: undefined }),
+    {
+      name: 'Redis Key Value',
+      description: 'Get the value of a Redis key',
+      mimeType: 'application/json',
+    },
+    async (uri: URL, variables: Variables) => {
+      try {
+        const redis = await getRedisManager();
+        if (!redis) {
+          return jsonResource(uri, { error: REDIS_DISABLED });
         }
 
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify({ databases }, null, 2),
-            },
-          ],
-        };
+        const database = templateDatabase(variables);
+        const key = templateVariable(variables, 'key');
+        const value = await redis.getValue(database, key);
+
+        return jsonTextResource(uri, encodeKeyValue(database, key, value));
       } catch (error) {
-        return {
-          contents: [
-            {
-              uri: uri.href,
-              mimeType: 'application/json',
-              text: JSON.stringify(
-                {
-                  error: `Failed to list Redis databases: ${error instanceof Error ? error.message : 'Unknown error'}`,
-                },
-                null,
-                2
-              ),
-            },
-          ],
-        };
+        return jsonResource(uri, {
+          error: `Failed to get Redis key value: ${errorMessage(error)}`,
+        });
       }
     }
   );
@@ -0,0 +1,63 @@
+/**
+ * Cross-Database Tools for Database MCP Server
+ * Tools that span every connected backend in a single call
+ */
+
+import { McpServer } from '@modelcontextprotocol/sdk/server/mcp.js';
+import { DatabaseSession, DatabaseConfig, sessionResolver } from '../types/session.js';
+import { errorMessage, jsonResult, toolHandler } from '../utils/format.js';
+
+/**
+ * Resolve a backend's listing, reporting a failure in place of the result
+ */
+async function listing<T>(list: () => Promise<T>): Promise<T | { error: string }> {
+  try {
+    return await list();
+  } catch (error) {
+    return { error: errorMessage(error) };
+  }
+}
+
+export function registerDatabaseTools(
+  server: McpServer,
+  config: DatabaseConfig,
+  sessions: Map<string, DatabaseSession>,
+  sessionId: string = 'default'
+): void {
+  console.error('🗄️  Registering cross-database tools...');
+
+  const getSession = sessionResolver(sessionId, config, sessions);
+
+  // List the databases of every connected backend at once
+  server.registerTool(
+    'list_all_databases',
+    {
+      description:
+        'List the databases of every connected backend (PostgreSQL, Redis, MongoDB) in one ' +
+        'call; backends are queried concurrently and one failing does not hide the others',
+    },
+    toolHandler('Failed to list databases', async () => {
+      const { postgres, redis, mongodb } = (await getSession()).clients;
+
+      // Disconnected backends report null; the rest are queried concurrently
+      const [postgresDatabases, redisDatabases, mongodbDatabases] = await Promise.all([
+        postgres ? listing(() => postgres.listDatabases()) : null,
+        redis ? listing(() => redis.getDatabases()) : null,
+        mongodb
+          ? listing(async () => {
+              const result = await mongodb.db('admin').admin().listDatabases({ nameOnly: true });
+              return result.databases.map(database => database.name);
+            })
+          : null,
+      ]);
+
+      return jsonResult('Databases by backend: ', {
+        postgres: postgresDatabases,
+        redis: redisDatabases,
+        mongodb: mongodbDatabases,
+      });
+    })
+  );
+
+  console.error('✅ Cross-database tools registered');
+}
@@ -8,12 +8,20 @@ import { registerPostgresTools } from './postgres.js';
 import { registerRedisTools } from './redis.js';
 import { registerMongoTools } from './mongodb.js';
 import { registerInfluxTools } from './influxdb.js';
+import { registerDatabaseTools } from './databases.js';
 
-export { registerPostgresTools, registerRedisTools, registerMongoTools, registerInfluxTools };
+export {
+  registerPostgresTools,
+  registerRedisTools,
+  registerMongoTools,
+  registerInfluxTools,
+  registerDatabaseTools,
+};
 
 export default {
   registerPostgresTools,
   registerRedisTools,
   registerMongoTools,
   registerInfluxTools,
+  registerDatabaseTools,
 };
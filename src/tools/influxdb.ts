@@ -4,69 +4,200 @@
  */
 
 import { McpServer } from '@modelcontextprotocol/sdk/server/mcp.js';
-import { DatabaseSession, DatabaseConfig, getOrCreateSession } from '../types/session.js';
+import { CallToolResult } from '@modelcontextprotocol/sdk/types.js';
+import { DatabaseSession, DatabaseConfig, sessionResolver } from '../types/session.js';
+import type { InfluxDB } from '@influxdata/influxdb-client';
 import { z } from 'zod';
+import { Singleflight, TtlCache } from '../utils/cache.js';
+import { jsonResult, jsonSequenceResult, textResult, toolHandler } from '../utils/format.js';
+
+// Query results reused when the same Flux query is repeated shortly after
+const QUERY_CACHE_TTL_MS = 5000;
+const QUERY_CACHE_SIZE = 256;
+
+// Flux scripts that write their results back with to(), which must never be served from cache
+const FLUX_WRITE_PATTERN = /\bto\s*\(/;
+
+// Relative Flux duration such as -30d or -1h30m
+const FLUX_DURATION_PATTERN = /^-(\d+(ns|us|µs|ms|s|m|h|d|w|mo|y))+$/;
+
+/**
+ * Quote a value as a Flux string literal, escaping interpolation as well as quotes
+ */
+function fluxString(value: string): string {
+  return `"${value.replace(/[\\"$]/g, '\\$&')}"`;
+}
+
+/**
+ * Turn a start argument into a Flux expression: a relative duration or an absolute time
+ */
+function fluxStart(start: string): string {
+  if (FLUX_DURATION_PATTERN.test(start)) {
+    return start;
+  }
+  if (Number.isNaN(Date.parse(start))) {
+    throw new Error(`Invalid start time '${start}'; use a duration like -30d or RFC3339`);
+  }
+  return `time(v: ${fluxString(start)})`;
+}
+
+/**
+ * Flux script listing a bucket's measurements and one measurement's field and tag keys,
+ * each under its own yield, so all three come back in a single query
+ */
+function describeScript(bucket: string, measurement: string, start: string): string {
+  const args = `bucket: ${fluxString(bucket)}, start: ${fluxStart(start)}`;
+  const scoped = `${args}, measurement: ${fluxString(measurement)}`;
+  return [
+    'import "influxdata/influxdb/schema"',
+    `schema.measurements(${args}) |> yield(name: "measurements")`,
+    `schema.measurementFieldKeys(${scoped}) |> yield(name: "fields")`,
+    `schema.measurementTagKeys(${scoped}) |> yield(name: "tags")`,
+  ].join('\n');
+}
+
+// Tool input schemas, built once and shared by every session's registration
+const INFLUXDB_QUERY_INPUT = {
+  bucket: z.string().describe('Target bucket name'),
+  flux_query: z.string().describe('Flux query to execute'),
+};
+
+const INFLUXDB_DESCRIBE_INPUT = {
+  bucket: z.string().describe('Bucket to describe'),
+  measurement: z.string().describe('Measurement whose field and tag keys are listed'),
+  start_time: z
+    .string()
+    .describe('How far back to look: a duration such as "-30d", or an RFC3339 time')
+    .default('-30d'),
+};
+
+const INFLUXDB_WRITE_DATA_INPUT = {
+  bucket: z.string().describe('Target bucket name'),
+  measurement: z.string().describe('Measurement name'),
+  tags: z
+    .string()
+    .describe('Tags in JSON format (e.g., \'{"host": "server1", "region": "us-west"}\')'),
+  fields: z
+    .string()
+    .describe('Fields in JSON format (e.g., \'{"temperature": 23.5, "humidity": 45.2}\')'),
+  timestamp: z
+    .string()
+    .describe('Optional timestamp (ISO format), uses current time if empty')
+    .optional(),
+};
+
+const INFLUXDB_CREATE_BUCKET_INPUT = {
+  bucket_name: z.string().describe('Name of the bucket to create'),
+  retention_period: z
+    .string()
+    .describe('Data retention period (e.g., "30d", "1h", "infinite")')
+    .default('30d'),
+};
+
+const INFLUXDB_DELETE_DATA_INPUT = {
+  bucket: z.string().describe('Target bucket name'),
+  start_time: z.string().describe('Start time (RFC3339 format, e.g., "2023-01-01T00:00:00Z")'),
+  end_time: z.string().describe('End time (RFC3339 format, e.g., "2023-01-02T00:00:00Z")'),
+  predicate: z
+    .string()
+    .describe('Optional delete predicate (e.g., \'_measurement="temperature"\')')
+    .optional(),
+};
 
 export function registerInfluxTools(
   server: McpServer,
   config: DatabaseConfig,
-  sessions: Map<string, DatabaseSession>
+  sessions: Map<string, DatabaseSession>,
+  sessionId: string = 'default'
 ): void {
   console.error('📈 Registering InfluxDB tools...');
 
+  const getSession = sessionResolver(sessionId, config, sessions);
+
+  // Resolve the session's InfluxDB client and the configured org, failing the call when
+  // either is missing
+  async function getInflux(): Promise<{ influxdb: InfluxDB; org: string }> {
+    const { influxdb } = (await getSession()).clients;
+    const org = config.influxdb?.org;
+    if (!influxdb || !org) {
+      throw new Error('InfluxDB client not available or org not configured');
+    }
+    return { influxdb, org };
+  }
+
+  // Keyed by write generation, bucket and query, so any write through this server misses
+  const queryResults = new TtlCache<string, CallToolResult>(QUERY_CACHE_TTL_MS, QUERY_CACHE_SIZE);
+  const inFlightQueries = new Singleflight<string, CallToolResult>();
+  let writeGeneration = 0;
+
   // Execute a Flux query on InfluxDB
   server.registerTool(
     'influxdb_query',
     {
       description: 'Execute a Flux query on InfluxDB',
-      inputSchema: {
-        bucket: z.string().describe('Target bucket name'),
-        flux_query: z.string().describe('Flux query to execute'),
-      },
+      inputSchema: INFLUXDB_QUERY_INPUT,
     },
-    async (args: { bucket: string; flux_query: string }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
+    toolHandler(
+      'Failed to execute InfluxDB query',
+      async (args: { bucket: string; flux_query: string }) => {
+        const { influxdb, org } = await getInflux();
+
+        const queryRows = () =>
+          jsonSequenceResult(
+            'InfluxDB query results: ',
+            influxdb.getQueryApi(org).iterateRows(args.flux_query),
+            row => row.tableMeta.toObject(row.values)
+          );
+
+        // Writing scripts always run, and like any write they invalidate cached reads
+        if (FLUX_WRITE_PATTERN.test(args.flux_query)) {
+          try {
+            return await queryRows();
+          } finally {
+            writeGeneration++;
+          }
+        }
 
-        if (!session.clients.influxdb || !config.influxdb?.org) {
-          throw new Error('InfluxDB client not available or org not configured');
+        const cacheKey = `${writeGeneration}\0${args.bucket}\0${args.flux_query}`;
+        const cached = queryResults.get(cacheKey);
+        if (cached !== undefined) {
+          return cached;
         }
 
-        const queryApi = session.clients.influxdb.getQueryApi(config.influxdb.org);
-        const results: any[] = [];
-
-        await new Promise<void>((resolve, reject) => {
-          queryApi.queryRows(args.flux_query, {
-            next(row: string[], tableMeta: any) {
-              const o = tableMeta.toObject(row);
-              results.push(o);
-            },
-            error: reject,
-            complete: () => resolve(),
-          });
+        // An identical query still running is joined rather than sent again
+        return inFlightQueries.run(cacheKey, async () => {
+          const result = await queryRows();
+          queryResults.set(cacheKey, result);
+          return result;
         });
+      }
+    )
+  );
+
+  // Describe a bucket's measurements and a measurement's fields and tags in one query
+  server.registerTool(
+    'influxdb_describe',
+    {
+      description:
+        "List a bucket's measurements plus one measurement's field keys and tag keys " +
+        'in a single Flux query',
+      inputSchema: INFLUXDB_DESCRIBE_INPUT,
+    },
+    toolHandler(
+      "Failed to describe InfluxDB bucket '{bucket}'",
+      async (args: { bucket: string; measurement: string; start_time?: string }) => {
+        const { influxdb, org } = await getInflux();
+
+        const script = describeScript(args.bucket, args.measurement, args.start_time || '-30d');
+        const schema: Record<string, unknown[]> = { measurements: [], fields: [], tags: [] };
+        for await (const { values, tableMeta } of influxdb.getQueryApi(org).iterateRows(script)) {
+          const row = tableMeta.toObject(values);
+          schema[row.result]?.push(row._value);
+        }
 
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `InfluxDB query results: ${JSON.stringify(results, null, 2)}`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to execute InfluxDB query: ${message}`,
-            },
-          ],
-        };
+        return jsonResult(`InfluxDB schema of '${args.bucket}': `, schema);
       }
-    }
+    )
   );
 
   // Write data to InfluxDB using line protocol format
@@ -74,35 +205,18 @@ export function registerInfluxTools(
     'influxdb_write_data',
     {
       description: 'Write data to InfluxDB using line protocol format',
-      inputSchema: {
-        bucket: z.string().describe('Target bucket name'),
-        measurement: z.string().describe('Measurement name'),
-        tags: z
-          .string()
-          .describe('Tags in JSON format (e.g., \'{"host": "server1", "region": "us-west"}\')'),
-        fields: z
-          .string()
-          .describe('Fields in JSON format (e.g., \'{"temperature": 23.5, "humidity": 45.2}\')'),
-        timestamp: z
-          .string()
-          .describe('Optional timestamp (ISO format), uses current time if empty')
-          .optional(),
-      },
+      inputSchema: INFLUXDB_WRITE_DATA_INPUT,
     },
-    async (args: {
-      bucket: string;
-      measurement: string;
-      tags: string;
-      fields: string;
-      timestamp?: string | undefined;
-    }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.influxdb || !config.influxdb?.org) {
-          throw new Error('InfluxDB client not available or org not configured');
-        }
+    toolHandler(
+      'Failed to write data to InfluxDB',
+      async (args: {
+        bucket: string;
+        measurement: string;
+        tags: string;
+        fields: string;
+        timestamp?: string | undefined;
+      }) => {
+        const { influxdb, org } = await getInflux();
 
         // Parse tags and fields from JSON
         const tagDict = JSON.parse(args.tags || '{}');
@@ -124,30 +238,19 @@ export function registerInfluxTools(
           lineProtocol += ` ${args.timestamp}`;
         }
 
-        const writeApi = session.clients.influxdb.getWriteApi(config.influxdb.org, args.bucket);
+        const writeApi = influxdb.getWriteApi(org, args.bucket);
         writeApi.writeRecord(lineProtocol);
-        await writeApi.close();
-
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Data written successfully to InfluxDB bucket '${args.bucket}': ${lineProtocol}`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to write data to InfluxDB: ${message}`,
-            },
-          ],
-        };
+        try {
+          await writeApi.close();
+        } finally {
+          writeGeneration++;
+        }
+
+        return textResult(
+          `Data written successfully to InfluxDB bucket '${args.bucket}': ${lineProtocol}`
+        );
       }
-    }
+    )
   );
 
   // Create a new bucket in InfluxDB
@@ -155,46 +258,21 @@ export function registerInfluxTools(
     'influxdb_create_bucket',
     {
       description: 'Create a new bucket in InfluxDB',
-      inputSchema: {
-        bucket_name: z.string().describe('Name of the bucket to create'),
-        retention_period: z
-          .string()
-          .describe('Data retention period (e.g., "30d", "1h", "infinite")')
-          .default('30d'),
-      },
+      inputSchema: INFLUXDB_CREATE_BUCKET_INPUT,
     },
-    async (args: { bucket_name: string; retention_period?: string }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.influxdb || !config.influxdb?.org) {
-          throw new Error('InfluxDB client not available or org not configured');
-        }
+    toolHandler(
+      "Failed to create InfluxDB bucket '{bucket_name}'",
+      async (args: { bucket_name: string; retention_period?: string }) => {
+        await getInflux();
 
         // Note: Bucket creation may require specific InfluxDB API setup
         // This is a placeholder for the bucket creation functionality
         const retentionPeriod = args.retention_period || '30d';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Bucket creation functionality not yet implemented for '${args.bucket_name}' with retention '${retentionPeriod}'. Please use InfluxDB UI or CLI.`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to create InfluxDB bucket '${args.bucket_name}': ${message}`,
-            },
-          ],
-        };
+        return textResult(
+          `Bucket creation functionality not yet implemented for '${args.bucket_name}' with retention '${retentionPeriod}'. Please use InfluxDB UI or CLI.`
+        );
       }
-    }
+    )
   );
 
   // Delete data from InfluxDB bucket
@@ -202,54 +280,25 @@ export function registerInfluxTools(
     'influxdb_delete_data',
     {
       description: 'Delete data from InfluxDB bucket',
-      inputSchema: {
-        bucket: z.string().describe('Target bucket name'),
-        start_time: z
-          .string()
-          .describe('Start time (RFC3339 format, e.g., "2023-01-01T00:00:00Z")'),
-        end_time: z.string().describe('End time (RFC3339 format, e.g., "2023-01-02T00:00:00Z")'),
-        predicate: z
-          .string()
-          .describe('Optional delete predicate (e.g., \'_measurement="temperature"\')')
-          .optional(),
-      },
+      inputSchema: INFLUXDB_DELETE_DATA_INPUT,
     },
-    async (args: {
-      bucket: string;
-      start_time: string;
-      end_time: string;
-      predicate?: string | undefined;
-    }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.influxdb || !config.influxdb?.org) {
-          throw new Error('InfluxDB client not available or org not configured');
-        }
+    toolHandler(
+      'Failed to delete data from InfluxDB',
+      async (args: {
+        bucket: string;
+        start_time: string;
+        end_time: string;
+        predicate?: string | undefined;
+      }) => {
+        await getInflux();
 
         // Note: Data deletion may require specific InfluxDB API setup
         // This is a placeholder for the data deletion functionality
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Data deletion functionality not yet implemented for bucket '${args.bucket}' between ${args.start_time} and ${args.end_time}. Please use InfluxDB UI or CLI.`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to delete data from InfluxDB: ${message}`,
-            },
-          ],
-        };
+        return textResult(
+          `Data deletion functionality not yet implemented for bucket '${args.bucket}' between ${args.start_time} and ${args.end_time}. Please use InfluxDB UI or CLI.`
+        );
       }
-    }
+    )
   );
 
   console.error('✅ InfluxDB tools registered');
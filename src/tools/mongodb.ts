@@ -4,70 +4,106 @@
  */
 
 import { McpServer } from '@modelcontextprotocol/sdk/server/mcp.js';
-import { DatabaseSession, DatabaseConfig, getOrCreateSession } from '../types/session.js';
+import { DatabaseSession, DatabaseConfig, sessionResolver } from '../types/session.js';
+import type { Document, MongoClient } from 'mongodb';
 import { z } from 'zod';
+import { jsonSequenceResult, textResult, toolHandler } from '../utils/format.js';
+
+/**
+ * Parse a read filter argument, skipping the parser for the common empty filter; writes must
+ * keep parsing their filter strictly so an empty string never matches every document
+ */
+function parseFilter(filterQuery: string | undefined): Document {
+  if (!filterQuery || filterQuery === '{}') {
+    return {};
+  }
+  return JSON.parse(filterQuery);
+}
+
+// Tool input schemas, built once and shared by every session's registration
+const MONGODB_FIND_DOCUMENTS_INPUT = {
+  database: z.string().describe('Database name'),
+  collection: z.string().describe('Collection name'),
+  filter_query: z.string().describe('Filter query as JSON string').default('{}'),
+  limit: z.number().describe('Maximum number of documents to return').default(10),
+};
+
+const MONGODB_AGGREGATE_INPUT = {
+  database: z.string().describe('Database name'),
+  collection: z.string().describe('Collection name'),
+  pipeline: z.string().describe('Aggregation pipeline as JSON array string'),
+};
+
+const MONGODB_INSERT_DOCUMENT_INPUT = {
+  database: z.string().describe('Database name'),
+  collection: z.string().describe('Collection name'),
+  document: z.string().describe('Document to insert as JSON string'),
+};
+
+const MONGODB_UPDATE_DOCUMENTS_INPUT = {
+  database: z.string().describe('Database name'),
+  collection: z.string().describe('Collection name'),
+  filter_query: z.string().describe('Filter query as JSON string'),
+  update_query: z.string().describe('Update query as JSON string'),
+};
+
+const MONGODB_DELETE_DOCUMENTS_INPUT = {
+  database: z.string().describe('Database name'),
+  collection: z.string().describe('Collection name'),
+  filter_query: z.string().describe('Filter query as JSON string'),
+};
+
+const MONGODB_CREATE_COLLECTION_INPUT = {
+  database: z.string().describe('Database name'),
+  collection: z.string().describe('Collection name'),
+};
 
 export function registerMongoTools(
   server: McpServer,
   config: DatabaseConfig,
-  sessions: Map<string, DatabaseSession>
+  sessions: Map<string, DatabaseSession>,
+  sessionId: string = 'default'
 ): void {
   console.error('🍃 Registering MongoDB tools...');
 
+  const getSession = sessionResolver(sessionId, config, sessions);
+
+  // Resolve the session's MongoDB client, failing the call when it is not connected
+  async function getMongo(): Promise<MongoClient> {
+    const { mongodb } = (await getSession()).clients;
+    if (!mongodb) {
+      throw new Error('MongoDB client not available');
+    }
+    return mongodb;
+  }
+
   // Find documents in a MongoDB collection
   server.registerTool(
     'mongodb_find_documents',
     {
       description: 'Find documents in a MongoDB collection',
-      inputSchema: {
-        database: z.string().describe('Database name'),
-        collection: z.string().describe('Collection name'),
-        filter_query: z.string().describe('Filter query as JSON string').default('{}'),
-        limit: z.number().describe('Maximum number of documents to return').default(10),
-      },
+      inputSchema: MONGODB_FIND_DOCUMENTS_INPUT,
     },
-    async (args: {
-      database: string;
-      collection: string;
-      filter_query?: string;
-      limit?: number;
-    }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.mongodb) {
-          throw new Error('MongoDB client not available');
-        }
-
-        const filterQuery = args.filter_query || '{}';
+    toolHandler(
+      'Failed to find MongoDB documents',
+      async (args: {
+        database: string;
+        collection: string;
+        filter_query?: string;
+        limit?: number;
+      }) => {
+        const mongodb = await getMongo();
+
         const limit = args.limit || 10;
-        const filterDict = JSON.parse(filterQuery);
+        const filterDict = parseFilter(args.filter_query);
 
-        const db = session.clients.mongodb.db(args.database);
+        const db = mongodb.db(args.database);
         const coll = db.collection(args.collection);
-        const documents = await coll.find(filterDict).limit(limit).toArray();
-
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `MongoDB documents from '${args.collection}': ${JSON.stringify(documents, null, 2)}`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to find MongoDB documents: ${message}`,
-            },
-          ],
-        };
+        const documents = coll.find(filterDict).limit(limit);
+
+        return jsonSequenceResult(`MongoDB documents from '${args.collection}': `, documents);
       }
-    }
+    )
   );
 
   // Execute MongoDB aggregation pipeline
@@ -75,46 +111,21 @@ export function registerMongoTools(
     'mongodb_aggregate',
     {
       description: 'Execute MongoDB aggregation pipeline',
-      inputSchema: {
-        database: z.string().describe('Database name'),
-        collection: z.string().describe('Collection name'),
-        pipeline: z.string().describe('Aggregation pipeline as JSON array string'),
-      },
+      inputSchema: MONGODB_AGGREGATE_INPUT,
     },
-    async (args: { database: string; collection: string; pipeline: string }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.mongodb) {
-          throw new Error('MongoDB client not available');
-        }
+    toolHandler(
+      'Failed to execute MongoDB aggregation',
+      async (args: { database: string; collection: string; pipeline: string }) => {
+        const mongodb = await getMongo();
 
         const pipelineList = JSON.parse(args.pipeline);
-        const db = session.clients.mongodb.db(args.database);
+        const db = mongodb.db(args.database);
         const coll = db.collection(args.collection);
-        const results = await coll.aggregate(pipelineList).toArray();
-
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `MongoDB aggregation results: ${JSON.stringify(results, null, 2)}`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to execute MongoDB aggregation: ${message}`,
-            },
-          ],
-        };
+        const results = coll.aggregate(pipelineList);
+
+        return jsonSequenceResult('MongoDB aggregation results: ', results);
       }
-    }
+    )
   );
 
   // Insert a document into a MongoDB collection
@@ -122,46 +133,23 @@ export function registerMongoTools(
     'mongodb_insert_document',
     {
       description: 'Insert a document into a MongoDB collection',
-      inputSchema: {
-        database: z.string().describe('Database name'),
-        collection: z.string().describe('Collection name'),
-        document: z.string().describe('Document to insert as JSON string'),
-      },
+      inputSchema: MONGODB_INSERT_DOCUMENT_INPUT,
     },
-    async (args: { database: string; collection: string; document: string }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.mongodb) {
-          throw new Error('MongoDB client not available');
-        }
+    toolHandler(
+      'Failed to insert MongoDB document',
+      async (args: { database: string; collection: string; document: string }) => {
+        const mongodb = await getMongo();
 
         const docDict = JSON.parse(args.document);
-        const db = session.clients.mongodb.db(args.database);
+        const db = mongodb.db(args.database);
         const coll = db.collection(args.collection);
         const result = await coll.insertOne(docDict);
 
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Document inserted successfully into '${args.collection}': ${result.insertedId}`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to insert MongoDB document: ${message}`,
-            },
-          ],
-        };
+        return textResult(
+          `Document inserted successfully into '${args.collection}': ${result.insertedId}`
+        );
       }
-    }
+    )
   );
 
   // Update documents in a MongoDB collection
@@ -169,54 +157,30 @@ export function registerMongoTools(
     'mongodb_update_documents',
     {
       description: 'Update documents in a MongoDB collection',
-      inputSchema: {
-        database: z.string().describe('Database name'),
-        collection: z.string().describe('Collection name'),
-        filter_query: z.string().describe('Filter query as JSON string'),
-        update_query: z.string().describe('Update query as JSON string'),
-      },
+      inputSchema: MONGODB_UPDATE_DOCUMENTS_INPUT,
     },
-    async (args: {
-      database: string;
-      collection: string;
-      filter_query: string;
-      update_query: string;
-    }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.mongodb) {
-          throw new Error('MongoDB client not available');
-        }
+    toolHandler(
+      'Failed to update MongoDB documents',
+      async (args: {
+        database: string;
+        collection: string;
+        filter_query: string;
+        update_query: string;
+      }) => {
+        const mongodb = await getMongo();
 
         const filterDict = JSON.parse(args.filter_query);
         const updateDict = JSON.parse(args.update_query);
 
-        const db = session.clients.mongodb.db(args.database);
+        const db = mongodb.db(args.database);
         const coll = db.collection(args.collection);
         const result = await coll.updateMany(filterDict, updateDict);
 
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Documents updated in '${args.collection}': ${result.modifiedCount} document(s) modified`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to update MongoDB documents: ${message}`,
-            },
-          ],
-        };
+        return textResult(
+          `Documents updated in '${args.collection}': ${result.modifiedCount} document(s) modified`
+        );
       }
-    }
+    )
   );
 
   // Delete documents from a MongoDB collection
@@ -224,46 +188,23 @@ export function registerMongoTools(
     'mongodb_delete_documents',
     {
       description: 'Delete documents from a MongoDB collection',
-      inputSchema: {
-        database: z.string().describe('Database name'),
-        collection: z.string().describe('Collection name'),
-        filter_query: z.string().describe('Filter query as JSON string'),
-      },
+      inputSchema: MONGODB_DELETE_DOCUMENTS_INPUT,
     },
-    async (args: { database: string; collection: string; filter_query: string }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.mongodb) {
-          throw new Error('MongoDB client not available');
-        }
+    toolHandler(
+      'Failed to delete MongoDB documents',
+      async (args: { database: string; collection: string; filter_query: string }) => {
+        const mongodb = await getMongo();
 
         const filterDict = JSON.parse(args.filter_query);
-        const db = session.clients.mongodb.db(args.database);
+        const db = mongodb.db(args.database);
         const coll = db.collection(args.collection);
         const result = await coll.deleteMany(filterDict);
 
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Documents deleted from '${args.collection}': ${result.deletedCount} document(s) removed`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to delete MongoDB documents: ${message}`,
-            },
-          ],
-        };
+        return textResult(
+          `Documents deleted from '${args.collection}': ${result.deletedCount} document(s) removed`
+        );
       }
-    }
+    )
   );
 
   // Create a new collection in a MongoDB database
@@ -271,43 +212,21 @@ export function registerMongoTools(
     'mongodb_create_collection',
     {
       description: 'Create a new collection in a MongoDB database',
-      inputSchema: {
-        database: z.string().describe('Database name'),
-        collection: z.string().describe('Collection name'),
-      },
+      inputSchema: MONGODB_CREATE_COLLECTION_INPUT,
     },
-    async (args: { database: string; collection: string }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
+    toolHandler(
+      "Failed to create MongoDB collection '{collection}'",
+      async (args: { database: string; collection: string }) => {
+        const mongodb = await getMongo();
 
-        if (!session.clients.mongodb) {
-          throw new Error('MongoDB client not available');
-        }
-
-        const db = session.clients.mongodb.db(args.database);
+        const db = mongodb.db(args.database);
         await db.createCollection(args.collection);
 
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Collection '${args.collection}' created successfully in database '${args.database}'`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to create MongoDB collection '${args.collection}': ${message}`,
-            },
-          ],
-        };
+        return textResult(
+          `Collection '${args.collection}' created successfully in database '${args.database}'`
+        );
       }
-    }
+    )
   );
 
   console.error('✅ MongoDB tools registered');
@@ -4,58 +4,127 @@
  */
 
 import { McpServer } from '@modelcontextprotocol/sdk/server/mcp.js';
-import { DatabaseSession, DatabaseConfig, getOrCreateSession } from '../types/session.js';
+import { QueryResult } from 'pg';
+import { DatabaseSession, DatabaseConfig, sessionResolver } from '../types/session.js';
+import {
+  PostgresManager,
+  isCacheableQuery,
+  quoteIdentifier,
+  quoteQualifiedName,
+} from '../managers/postgres.js';
 import { z } from 'zod';
+import { Singleflight, TtlCache } from '../utils/cache.js';
+import { jsonLines, textResult, toolHandler } from '../utils/format.js';
+
+// Formatted read results reused when the same query is repeated shortly after
+const QUERY_CACHE_TTL_MS = 5000;
+const QUERY_CACHE_SIZE = 256;
+
+/**
+ * Serialize a query result's rows, one row object per line
+ */
+function formatRows(result: QueryResult): string {
+  return result.rows.length === 0 ? '[]' : jsonLines(result.rows);
+}
+
+// Tool input schemas, built once and shared by every session's registration
+const POSTGRES_QUERY_INPUT = {
+  sql: z.string().describe('SQL query to execute'),
+  database: z
+    .string()
+    .describe('Target database name (defaults to the connection database)')
+    .optional(),
+};
+
+const POSTGRES_EXECUTE_INPUT = {
+  sql: z.string().describe('SQL statement to execute'),
+  database: z
+    .string()
+    .describe('Target database name (defaults to the connection database)')
+    .optional(),
+  background: z
+    .boolean()
+    .describe(
+      'Queue the statement and return immediately; statements on the same database still run in order'
+    )
+    .optional(),
+};
+
+const POSTGRES_CREATE_TABLE_INPUT = {
+  database: z.string().describe('Target database name'),
+  table_name: z.string().describe('Name of the table to create'),
+  columns: z
+    .string()
+    .describe(
+      'Column definitions (e.g., "id SERIAL PRIMARY KEY, name VARCHAR(100), email VARCHAR(255)")'
+    ),
+};
+
+const POSTGRES_CREATE_DATABASE_INPUT = {
+  database_name: z.string().describe('Name of the database to create'),
+};
 
 export function registerPostgresTools(
   server: McpServer,
   config: DatabaseConfig,
-  sessions: Map<string, DatabaseSession>
+  sessions: Map<string, DatabaseSession>,
+  sessionId: string = 'default'
 ): void {
   console.error('🐘 Registering PostgreSQL tools...');
 
+  const getSession = sessionResolver(sessionId, config, sessions);
+
+  // Resolve the session's PostgreSQL client, failing the call when it is not connected
+  async function getPostgres(): Promise<PostgresManager> {
+    const { postgres } = (await getSession()).clients;
+    if (!postgres) {
+      throw new Error('PostgreSQL client not available');
+    }
+    return postgres;
+  }
+
+  // Keyed by database, write generation and SQL, so any write to the database misses
+  const queryResults = new TtlCache<string, string>(QUERY_CACHE_TTL_MS, QUERY_CACHE_SIZE);
+  const inFlightQueries = new Singleflight<string, string>();
+
   // Execute a PostgreSQL query (SELECT)
   server.registerTool(
     'postgres_query',
     {
       description: 'Execute a SQL query on PostgreSQL and return the results',
-      inputSchema: {
-        sql: z.string().describe('SQL query to execute'),
-        database: z.string().describe('Target database name').default('postgres'),
-      },
+      inputSchema: POSTGRES_QUERY_INPUT,
     },
-    async (args: { sql: string; database?: string }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
+    toolHandler(
+      "PostgreSQL query failed on '{database}'",
+      async (args: { sql: string; database?: string | undefined }, resolved) => {
+        const postgres = await getPostgres();
+
+        const database = args.database || postgres.defaultDatabase;
+        resolved.database = database;
+        const runQuery = async () => {
+          const result = await postgres.query(database, args.sql);
+          return `Query executed successfully on PostgreSQL '${database}'. Results: ${formatRows(result)}`;
+        };
 
-        if (!session.clients.postgres) {
-          throw new Error('PostgreSQL client not available');
+        // Writes and reads whose result varies between calls (nextval(), random(), now(), ...)
+        // always run; two concurrent callers must each get their own result
+        if (!isCacheableQuery(args.sql)) {
+          return textResult(await runQuery());
         }
 
-        const database = args.database || 'postgres';
-        const result = await session.clients.postgres.query(args.sql);
-
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Query executed successfully on PostgreSQL '${database}'. Results: ${JSON.stringify(result.rows, null, 2)}`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `PostgreSQL query failed on '${args.database || 'postgres'}': ${message}`,
-            },
-          ],
-        };
+        // A recent identical read is reused; one still running is joined rather than repeated
+        const cacheKey = `${database}\0${postgres.writeGeneration(database)}\0${args.sql}`;
+        const text =
+          queryResults.get(cacheKey) ??
+          (await inFlightQueries.run(cacheKey, async () => {
+            const fresh = await runQuery();
+            queryResults.set(cacheKey, fresh);
+            return fresh;
+          }));
+
+        return textResult(text);
       }
-    }
+    )
   );
 
   // Execute INSERT, UPDATE, DELETE, or DDL statements
@@ -63,43 +132,37 @@ export function registerPostgresTools(
     'postgres_execute',
     {
       description: 'Execute INSERT, UPDATE, DELETE, or DDL statements on PostgreSQL',
-      inputSchema: {
-        sql: z.string().describe('SQL statement to execute'),
-        database: z.string().describe('Target database name').default('postgres'),
-      },
+      inputSchema: POSTGRES_EXECUTE_INPUT,
     },
-    async (args: { sql: string; database?: string }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.postgres) {
-          throw new Error('PostgreSQL client not available');
+    toolHandler(
+      "PostgreSQL SQL execution failed on '{database}'",
+      async (
+        args: {
+          sql: string;
+          database?: string | undefined;
+          background?: boolean | undefined;
+        },
+        resolved
+      ) => {
+        const postgres = await getPostgres();
+
+        const database = args.database || postgres.defaultDatabase;
+        resolved.database = database;
+
+        if (args.background) {
+          const writeId = postgres.enqueueWrite(database, args.sql);
+          return textResult(
+            `SQL queued as background write #${writeId} on PostgreSQL '${database}'`
+          );
         }
 
-        const database = args.database || 'postgres';
-        const result = await session.clients.postgres.query(args.sql);
+        const result = await postgres.execute(database, args.sql);
 
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `SQL executed successfully on PostgreSQL '${database}': ${result.rowCount || 0} rows affected`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `PostgreSQL SQL execution failed on '${args.database || 'postgres'}': ${message}`,
-            },
-          ],
-        };
+        return textResult(
+          `SQL executed successfully on PostgreSQL '${database}': ${result.rowCount || 0} rows affected`
+        );
       }
-    }
+    )
   );
 
   // Create a new table
@@ -107,48 +170,21 @@ export function registerPostgresTools(
     'postgres_create_table',
     {
       description: 'Create a new table in PostgreSQL database',
-      inputSchema: {
-        database: z.string().describe('Target database name'),
-        table_name: z.string().describe('Name of the table to create'),
-        columns: z
-          .string()
-          .describe(
-            'Column definitions (e.g., "id SERIAL PRIMARY KEY, name VARCHAR(100), email VARCHAR(255)")'
-          ),
-      },
+      inputSchema: POSTGRES_CREATE_TABLE_INPUT,
     },
-    async (args: { database: string; table_name: string; columns: string }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
+    toolHandler(
+      "Failed to create table '{table_name}' in PostgreSQL '{database}'",
+      async (args: { database: string; table_name: string; columns: string }) => {
+        const postgres = await getPostgres();
 
-        if (!session.clients.postgres) {
-          throw new Error('PostgreSQL client not available');
-        }
-
-        const sql = `CREATE TABLE ${args.table_name} (${args.columns})`;
-        const result = await session.clients.postgres.query(sql);
+        const sql = `CREATE TABLE ${quoteQualifiedName(args.table_name)} (${args.columns})`;
+        const result = await postgres.execute(args.database, sql);
 
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Table '${args.table_name}' created successfully in PostgreSQL '${args.database}': ${result.rowCount || 0} rows affected`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to create table '${args.table_name}' in PostgreSQL '${args.database}': ${message}`,
-            },
-          ],
-        };
+        return textResult(
+          `Table '${args.table_name}' created successfully in PostgreSQL '${args.database}': ${result.rowCount || 0} rows affected`
+        );
       }
-    }
+    )
   );
 
   // Create a new database
@@ -156,42 +192,21 @@ export function registerPostgresTools(
     'postgres_create_database',
     {
       description: 'Create a new PostgreSQL database',
-      inputSchema: {
-        database_name: z.string().describe('Name of the database to create'),
-      },
+      inputSchema: POSTGRES_CREATE_DATABASE_INPUT,
     },
-    async (args: { database_name: string }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.postgres) {
-          throw new Error('PostgreSQL client not available');
-        }
+    toolHandler(
+      "Failed to create PostgreSQL database '{database_name}'",
+      async (args: { database_name: string }) => {
+        const postgres = await getPostgres();
 
-        const sql = `CREATE DATABASE ${args.database_name}`;
-        const result = await session.clients.postgres.query(sql);
+        const sql = `CREATE DATABASE ${quoteIdentifier(args.database_name)}`;
+        const result = await postgres.execute(postgres.defaultDatabase, sql);
 
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Database '${args.database_name}' created successfully: ${result.rowCount || 0} rows affected`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to create PostgreSQL database '${args.database_name}': ${message}`,
-            },
-          ],
-        };
+        return textResult(
+          `Database '${args.database_name}' created successfully: ${result.rowCount || 0} rows affected`
+        );
       }
-    }
+    )
   );
 
   console.error('✅ PostgreSQL tools registered');
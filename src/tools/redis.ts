@@ -4,194 +4,315 @@
  */
 
 import { McpServer } from '@modelcontextprotocol/sdk/server/mcp.js';
-import { DatabaseSession, DatabaseConfig, getOrCreateSession } from '../types/session.js';
-import { z } from 'zod';
+import { CallToolResult } from '@modelcontextprotocol/sdk/types.js';
+import { DatabaseSession, DatabaseConfig, sessionResolver } from '../types/session.js';
+import { RedisManager } from '../managers/redis.js';
+import { ZodRawShape, z } from 'zod';
+import {
+  errorResult,
+  failedResult,
+  jsonResult,
+  textResult,
+  toolErrorHandler,
+} from '../utils/format.js';
+
+/**
+ * Build the result for a failed Redis tool call.
+ *
+ * Replies Redis itself rejected (wrong type, unknown command, bad arguments) are the
+ * caller's mistake and go straight back; anything else is logged in full for the operator.
+ */
+function redisErrorResult(summary: string, error: unknown): CallToolResult {
+  // Matched by name so registering these tools does not load ioredis
+  if (error instanceof Error && error.name === 'ReplyError') {
+    return failedResult(`${summary}: ${error.message}`);
+  }
+  return errorResult(summary, error);
+}
+
+// Wraps a Redis tool handler so its failures go through redisErrorResult
+const redisToolHandler = toolErrorHandler(redisErrorResult);
+
+/**
+ * Arguments shared by the single-command tools; each tool's schema marks which are required
+ */
+interface DatabaseCommandArgs {
+  key?: string | undefined;
+  value?: string | undefined;
+  database?: number;
+}
+
+/**
+ * A tool that runs one Redis command against one database and reports its reply
+ */
+interface DatabaseCommandTool {
+  name: string;
+  description: string;
+  inputSchema: ZodRawShape;
+  command: string;
+  commandArgs: (args: DatabaseCommandArgs) => string[];
+  success: (args: DatabaseCommandArgs, database: number, result: unknown) => string;
+  failure: string;
+}
+
+// Built once at load rather than per session; registerRedisTools only binds each to a client
+const DATABASE_COMMAND_TOOLS: DatabaseCommandTool[] = [
+  {
+    name: 'redis_set_key',
+    description: 'Set a Redis key-value pair',
+    inputSchema: {
+      key: z.string().describe('Redis key'),
+      value: z.string().describe('Redis value'),
+      database: z.number().int().nonnegative().describe('Redis database number').default(0),
+    },
+    command: 'SET',
+    commandArgs: args => [args.key!, args.value!],
+    success: (args, database, result) =>
+      `Redis key '${args.key}' set successfully in database ${database}: ${result}`,
+    failure: "Failed to set Redis key '{key}'",
+  },
+  {
+    name: 'redis_delete_key',
+    description: 'Delete a Redis key',
+    inputSchema: {
+      key: z.string().describe('Redis key to delete'),
+      database: z.number().int().nonnegative().describe('Redis database number').default(0),
+    },
+    command: 'DEL',
+    commandArgs: args => [args.key!],
+    success: (args, database, result) =>
+      `Redis key '${args.key}' deleted from database ${database}: ${result} key(s) removed`,
+    failure: "Failed to delete Redis key '{key}'",
+  },
+  {
+    name: 'redis_flush_database',
+    description: 'Flush all keys from a Redis database',
+    inputSchema: {
+      database: z
+        .number()
+        .int()
+        .nonnegative()
+        .describe('Redis database number to flush')
+        .default(0),
+    },
+    command: 'FLUSHDB',
+    commandArgs: () => [],
+    success: (_args, database, result) =>
+      `Redis database ${database} flushed successfully: ${result}`,
+    failure: 'Failed to flush Redis database {database}',
+  },
+];
+
+// Tool input schemas, built once and shared by every session's registration
+const REDIS_EXECUTE_COMMAND_INPUT = {
+  command: z.string().describe('Redis command to execute'),
+  args: z.array(z.string()).describe('Command arguments').optional(),
+  database: z
+    .number()
+    .int()
+    .nonnegative()
+    .describe('Redis database number (defaults to the connection database)')
+    .optional(),
+};
+
+const REDIS_EXECUTE_PIPELINE_INPUT = {
+  commands: z
+    .array(z.array(z.string()).min(1))
+    .min(1)
+    .describe('Commands to execute, e.g. [["SET", "a", "1"], ["GET", "a"]]'),
+  database: z
+    .number()
+    .int()
+    .nonnegative()
+    .describe('Redis database number (defaults to the connection database)')
+    .optional(),
+};
+
+const REDIS_LIST_KEYS_INPUT = {
+  pattern: z.string().describe('Glob-style key pattern').default('*'),
+  database: z.number().int().nonnegative().describe('Redis database number').default(0),
+  count: z
+    .number()
+    .int()
+    .positive()
+    .describe('Initial keys examined per SCAN call (Redis COUNT hint), widened while none match')
+    .default(1000),
+  limit: z.number().int().positive().describe('Maximum number of keys to return').optional(),
+};
+
+const REDIS_MGET_VALUES_INPUT = {
+  keys: z.array(z.string()).min(1).describe('Redis keys to read'),
+  database: z.number().int().nonnegative().describe('Redis database number').default(0),
+};
+
+const REDIS_GET_KEYS_INFO_INPUT = {
+  keys: z.array(z.string()).min(1).describe('Redis keys to describe'),
+  database: z.number().int().nonnegative().describe('Redis database number').default(0),
+};
 
 export function registerRedisTools(
   server: McpServer,
   config: DatabaseConfig,
-  sessions: Map<string, DatabaseSession>
+  sessions: Map<string, DatabaseSession>,
+  sessionId: string = 'default'
 ): void {
   console.error('🔴 Registering Redis tools...');
 
+  const getSession = sessionResolver(sessionId, config, sessions);
+
+  // Resolve the session's Redis client, failing the call when it is not connected
+  async function getRedis(): Promise<RedisManager> {
+    const { redis } = (await getSession()).clients;
+    if (!redis) {
+      throw new Error('Redis client not available');
+    }
+    return redis;
+  }
+
   // Execute a Redis command
   server.registerTool(
     'redis_execute_command',
     {
       description: 'Execute a Redis command',
-      inputSchema: {
-        command: z.string().describe('Redis command to execute'),
-        args: z.array(z.string()).describe('Command arguments').optional(),
-      },
+      inputSchema: REDIS_EXECUTE_COMMAND_INPUT,
     },
-    async (args: { command: string; args?: string[] | undefined }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.redis) {
-          throw new Error('Redis client not available');
-        }
-
-        const commandArgs = args.args || [];
-        const result = await session.clients.redis.call(args.command, ...commandArgs);
-
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Redis command result: ${JSON.stringify(result, null, 2)}`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to execute Redis command: ${message}`,
-            },
-          ],
-        };
+    redisToolHandler(
+      'Failed to execute Redis command',
+      async (args: {
+        command: string;
+        args?: string[] | undefined;
+        database?: number | undefined;
+      }) => {
+        const redis = await getRedis();
+
+        const result = await redis.executeCommand(
+          args.command,
+          args.args,
+          args.database
+        );
+
+        return jsonResult('Redis command result: ', result);
       }
-    }
+    )
   );
 
-  // Set a Redis key-value pair
+  // Execute several Redis commands in one round trip
   server.registerTool(
-    'redis_set_key',
+    'redis_execute_pipeline',
     {
-      description: 'Set a Redis key-value pair',
-      inputSchema: {
-        key: z.string().describe('Redis key'),
-        value: z.string().describe('Redis value'),
-        database: z.number().describe('Redis database number').default(0),
-      },
+      description:
+        'Execute a batch of Redis commands in a single round trip (not a transaction); ' +
+        'each command is a list of the command name followed by its arguments',
+      inputSchema: REDIS_EXECUTE_PIPELINE_INPUT,
     },
-    async (args: { key: string; value: string; database?: number }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
+    redisToolHandler(
+      'Failed to execute Redis pipeline',
+      async (args: { commands: string[][]; database?: number | undefined }) => {
+        const redis = await getRedis();
 
-        if (!session.clients.redis) {
-          throw new Error('Redis client not available');
-        }
+        const results = await redis.executePipeline(args.commands, args.database);
 
-        const database = args.database || 0;
-        await session.clients.redis.select(database);
-        const result = await session.clients.redis.set(args.key, args.value);
-
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Redis key '${args.key}' set successfully in database ${database}: ${result}`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to set Redis key '${args.key}': ${message}`,
-            },
-          ],
-        };
+        return jsonResult(`Redis pipeline results (${results.length} commands): `, results);
       }
-    }
+    )
   );
 
-  // Delete a Redis key
+  // List keys matching a pattern
   server.registerTool(
-    'redis_delete_key',
+    'redis_list_keys',
     {
-      description: 'Delete a Redis key',
-      inputSchema: {
-        key: z.string().describe('Redis key to delete'),
-        database: z.number().describe('Redis database number').default(0),
-      },
+      description:
+        'List Redis keys matching a pattern using non-blocking SCAN iteration; ' +
+        'set limit to stop early on large keyspaces',
+      inputSchema: REDIS_LIST_KEYS_INPUT,
     },
-    async (args: { key: string; database?: number }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
-
-        if (!session.clients.redis) {
-          throw new Error('Redis client not available');
-        }
+    redisToolHandler(
+      'Failed to list Redis keys',
+      async (args: {
+        pattern?: string;
+        database?: number;
+        count?: number;
+        limit?: number | undefined;
+      }) => {
+        const redis = await getRedis();
 
         const database = args.database || 0;
-        await session.clients.redis.select(database);
-        const result = await session.clients.redis.del(args.key);
-
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Redis key '${args.key}' deleted from database ${database}: ${result} key(s) removed`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to delete Redis key '${args.key}': ${message}`,
-            },
-          ],
-        };
+        // Fetch one extra key to tell whether the limit cut the listing short
+        const keys = await redis.getKeys(
+          database,
+          args.pattern || '*',
+          args.limit === undefined ? undefined : args.limit + 1,
+          args.count
+        );
+        const truncated = args.limit !== undefined && keys.length > args.limit;
+
+        return jsonResult(`Redis keys in database ${database}: `, {
+          keys: truncated ? keys.slice(0, args.limit) : keys,
+          truncated,
+        });
       }
-    }
+    )
   );
 
-  // Flush all keys from a Redis database
+  // Get the values of several string keys in one round trip
   server.registerTool(
-    'redis_flush_database',
+    'redis_mget_values',
     {
-      description: 'Flush all keys from a Redis database',
-      inputSchema: {
-        database: z.number().describe('Redis database number to flush').default(0),
-      },
+      description:
+        'Get the values of several Redis string keys in a single round trip; ' +
+        'missing and non-string keys return null',
+      inputSchema: REDIS_MGET_VALUES_INPUT,
     },
-    async (args: { database?: number }) => {
-      try {
-        const sessionId = 'default';
-        const session = await getOrCreateSession(sessionId, config, sessions);
+    redisToolHandler(
+      'Failed to get Redis values',
+      async (args: { keys: string[]; database?: number }) => {
+        const redis = await getRedis();
 
-        if (!session.clients.redis) {
-          throw new Error('Redis client not available');
-        }
+        const database = args.database || 0;
+        const values = await redis.getValues(database, args.keys);
+
+        return jsonResult(`Redis values from database ${database}: `, values);
+      }
+    )
+  );
+
+  // Get metadata for several keys in one round trip
+  server.registerTool(
+    'redis_get_keys_info',
+    {
+      description:
+        'Get type, TTL, encoding and memory usage for several Redis keys in a single round trip',
+      inputSchema: REDIS_GET_KEYS_INFO_INPUT,
+    },
+    redisToolHandler(
+      'Failed to get Redis key info',
+      async (args: { keys: string[]; database?: number }) => {
+        const redis = await getRedis();
 
         const database = args.database || 0;
-        await session.clients.redis.select(database);
-        const result = await session.clients.redis.flushdb();
-
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Redis database ${database} flushed successfully: ${result}`,
-            },
-          ],
-        };
-      } catch (error) {
-        const message = error instanceof Error ? error.message : 'Unknown error';
-        return {
-          content: [
-            {
-              type: 'text',
-              text: `Failed to flush Redis database ${args.database || 0}: ${message}`,
-            },
-          ],
-        };
+        const infos = await redis.getKeysInfo(database, args.keys);
+
+        return jsonResult(`Redis key info from database ${database}: `, infos);
       }
-    }
+    )
   );
 
+  // Single-command tools: set, delete and flush
+  for (const tool of DATABASE_COMMAND_TOOLS) {
+    server.registerTool(
+      tool.name,
+      { description: tool.description, inputSchema: tool.inputSchema },
+      redisToolHandler(tool.failure, async (args: DatabaseCommandArgs, resolved) => {
+        const redis = await getRedis();
+
+        const database = args.database || 0;
+        resolved.database = database;
+        const result = await redis.commandOnDb(database, tool.command, ...tool.commandArgs(args));
+
+        return textResult(tool.success(args, database, result));
+      })
+    );
+  }
+
   console.error('✅ Redis tools registered');
 }
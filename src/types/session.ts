@@ -5,10 +5,12 @@
  * Supports multiple database types with proper connection management and cleanup.
  */
 
-import { Client as PostgresClient } from 'pg';
-import Redis from 'ioredis';
-import { MongoClient } from 'mongodb';
-import { InfluxDB } from '@influxdata/influxdb-client';
+// Drivers for optional backends are imported on first use, so a disabled backend never
+// loads its client library
+import type { MongoClient } from 'mongodb';
+import type { InfluxDB } from '@influxdata/influxdb-client';
+import { PostgresManager } from '../managers/postgres.js';
+import { RedisManager } from '../managers/redis.js';
 
 /**
  * Configuration interface for database connections
@@ -17,6 +19,9 @@ export interface DatabaseConfig {
   postgres: {
     enabled: boolean;
     url?: string | undefined;
+    poolMax?: number | undefined;
+    poolMin?: number | undefined;
+    connectAll?: boolean | undefined;
   };
   redis?: {
     enabled: boolean;
@@ -36,13 +41,31 @@ export interface DatabaseConfig {
 }
 
 /**
- * Database clients for a session
+ * Parse a configured connection URL, or undefined when it is missing or malformed
+ */
+export function parseConnectionUrl(url: string | undefined): URL | undefined {
+  if (!url) {
+    return undefined;
+  }
+  try {
+    return new URL(url);
+  } catch {
+    return undefined;
+  }
+}
+
+/**
+ * Database clients for a session.
+ *
+ * Every field is always present, undefined when its backend is disabled or failed to
+ * connect, so all sessions share one object shape whatever order their backends
+ * connected in, and client lookups in tool handlers stay monomorphic.
  */
 export interface DatabaseClients {
-  postgres?: PostgresClient;
-  redis?: Redis;
-  mongodb?: MongoClient;
-  influxdb?: InfluxDB;
+  postgres: PostgresManager | undefined;
+  redis: RedisManager | undefined;
+  mongodb: MongoClient | undefined;
+  influxdb: InfluxDB | undefined;
 }
 
 /**
@@ -56,53 +79,176 @@ export interface DatabaseSession {
 }
 
 /**
- * Initialize database clients for a session
+ * A connection manager shared by every session connected to the same URL
  */
-export async function initializeSessionClients(config: DatabaseConfig): Promise<DatabaseClients> {
-  const clients: DatabaseClients = {};
+interface SharedManager<T> {
+  manager: Promise<T>;
+  sessions: number;
+}
 
-  // Initialize PostgreSQL client
-  if (config.postgres.enabled && config.postgres.url) {
-    try {
-      const postgres = new PostgresClient({
-        connectionString: config.postgres.url,
-        ssl: config.postgres.url.includes('localhost') ? false : { rejectUnauthorized: false },
-      });
-      await postgres.connect();
-      clients.postgres = postgres;
-      console.error(`PostgreSQL client connected`);
-    } catch (error) {
-      console.error(`Failed to connect to PostgreSQL:`, error);
-    }
+const sharedPostgresManagers = new Map<string, SharedManager<PostgresManager>>();
+const sharedRedisManagers = new Map<string, SharedManager<RedisManager>>();
+
+/**
+ * Get the manager for a URL from a registry, connecting on first use, and count the
+ * caller as a user
+ */
+async function acquireManager<T>(
+  registry: Map<string, SharedManager<T>>,
+  url: string,
+  connect: (url: string) => Promise<T>
+): Promise<T> {
+  let shared = registry.get(url);
+  if (!shared) {
+    const entry: SharedManager<T> = { manager: connect(url), sessions: 0 };
+    // A failed connection is forgotten so the next session retries
+    entry.manager.catch(() => {
+      if (registry.get(url) === entry) {
+        registry.delete(url);
+      }
+    });
+    registry.set(url, entry);
+    shared = entry;
+  }
+
+  // Counted before awaiting so a concurrent release cannot disconnect it underneath us
+  shared.sessions++;
+  try {
+    return await shared.manager;
+  } catch (error) {
+    shared.sessions--;
+    throw error;
+  }
+}
+
+/**
+ * Drop a session's use of a shared manager, closing it after the last one
+ */
+function releaseManager<T>(
+  registry: Map<string, SharedManager<T>>,
+  url: string,
+  close: (manager: T) => Promise<void> | void
+): void {
+  const shared = registry.get(url);
+  if (!shared || --shared.sessions > 0) {
+    return;
   }
 
-  // Initialize Redis client
-  if (config.redis?.enabled && config.redis.url) {
+  registry.delete(url);
+  void shared.manager.then(close).catch(error => {
+    console.error(`Error closing shared connection:`, error);
+  });
+}
+
+/**
+ * Open a PostgreSQL manager and warm its default pool, plus every other database's when
+ * connectAll is set
+ */
+async function connectPostgres(
+  url: string,
+  { poolMax, poolMin, connectAll }: DatabaseConfig['postgres']
+): Promise<PostgresManager> {
+  const postgres = new PostgresManager(url, poolMax, poolMin);
+  try {
+    await postgres.warm();
+  } catch (error) {
+    await postgres.end();
+    throw error;
+  }
+  console.error(`PostgreSQL pool connected`);
+
+  if (connectAll) {
     try {
-      const redis = new Redis(config.redis.url);
-      await redis.ping();
-      clients.redis = redis;
-      console.error(`Redis client connected`);
+      const databases = await postgres.connectAll();
+      console.error(`PostgreSQL pools connected for ${databases.length} more database(s)`);
     } catch (error) {
-      console.error(`Failed to connect to Redis:`, error);
+      console.error(`Failed to discover PostgreSQL databases:`, error);
     }
   }
+  return postgres;
+}
+
+/**
+ * Close a shared PostgreSQL manager once its last session is gone
+ */
+async function closePostgres(postgres: PostgresManager): Promise<void> {
+  await postgres.end();
+  console.error(`PostgreSQL pools closed`);
+}
+
+/**
+ * Connect to Redis and wrap the connection in a manager
+ */
+async function connectRedis(url: string): Promise<RedisManager> {
+  const { default: Redis } = await import('ioredis');
+  const redis = new Redis(url);
+  try {
+    await redis.ping();
+  } catch (error) {
+    redis.disconnect();
+    throw error;
+  }
+  console.error(`Redis client connected`);
+  return new RedisManager(redis);
+}
+
+/**
+ * Close a shared Redis manager once its last session is gone
+ */
+function closeRedis(redis: RedisManager): void {
+  redis.disconnect();
+  console.error(`Redis connection closed`);
+}
+
+/**
+ * Initialize database clients for a session
+ */
+export async function initializeSessionClients(config: DatabaseConfig): Promise<DatabaseClients> {
+  const clients: DatabaseClients = {
+    postgres: undefined,
+    redis: undefined,
+    mongodb: undefined,
+    influxdb: undefined,
+  };
+  const connections: Array<{ name: string; connect: Promise<void> }> = [];
+
+  // Attach the shared PostgreSQL manager
+  const postgresUrl = config.postgres.url;
+  if (config.postgres.enabled && postgresUrl) {
+    const connect = async () => {
+      clients.postgres = await acquireManager(sharedPostgresManagers, postgresUrl, url =>
+        connectPostgres(url, config.postgres)
+      );
+    };
+    connections.push({ name: 'PostgreSQL', connect: connect() });
+  }
+
+  // Attach the shared Redis manager
+  const redisUrl = config.redis?.url;
+  if (config.redis?.enabled && redisUrl) {
+    const connect = async () => {
+      clients.redis = await acquireManager(sharedRedisManagers, redisUrl, connectRedis);
+    };
+    connections.push({ name: 'Redis', connect: connect() });
+  }
 
   // Initialize MongoDB client
-  if (config.mongodb?.enabled && config.mongodb.url) {
-    try {
-      const mongodb = new MongoClient(config.mongodb.url);
+  const mongodbUrl = config.mongodb?.url;
+  if (config.mongodb?.enabled && mongodbUrl) {
+    const connect = async () => {
+      const { MongoClient } = await import('mongodb');
+      const mongodb = new MongoClient(mongodbUrl);
       await mongodb.connect();
       clients.mongodb = mongodb;
       console.error(`MongoDB client connected`);
-    } catch (error) {
-      console.error(`Failed to connect to MongoDB:`, error);
-    }
+    };
+    connections.push({ name: 'MongoDB', connect: connect() });
   }
 
   // Initialize InfluxDB client
   if (config.influxdb?.enabled && config.influxdb.url && config.influxdb.token) {
     try {
+      const { InfluxDB } = await import('@influxdata/influxdb-client');
       const influxdb = new InfluxDB({
         url: config.influxdb.url,
         token: config.influxdb.token,
@@ -114,6 +260,15 @@ export async function initializeSessionClients(config: DatabaseConfig): Promise<
     }
   }
 
+  // Connect to every backend at once, so startup waits for the slowest handshake
+  // rather than the sum of them; one failing backend does not stop the others
+  const results = await Promise.allSettled(connections.map(({ connect }) => connect));
+  results.forEach((result, index) => {
+    if (result.status === 'rejected') {
+      console.error(`Failed to connect to ${connections[index]!.name}:`, result.reason);
+    }
+  });
+
   return clients;
 }
 
@@ -132,19 +287,19 @@ export async function createDatabaseSession(
     clients,
     async cleanup() {
       // Close all database connections
-      if (clients.postgres) {
+      if (clients.postgres && config.postgres.url) {
         try {
-          await clients.postgres.end();
-          console.error(`[${sessionId}] PostgreSQL connection closed`);
+          releaseManager(sharedPostgresManagers, config.postgres.url, closePostgres);
+          console.error(`[${sessionId}] PostgreSQL pools released`);
         } catch (error) {
           console.error(`[${sessionId}] Error closing PostgreSQL:`, error);
         }
       }
 
-      if (clients.redis) {
+      if (clients.redis && config.redis?.url) {
         try {
-          clients.redis.disconnect();
-          console.error(`[${sessionId}] Redis connection closed`);
+          releaseManager(sharedRedisManagers, config.redis.url, closeRedis);
+          console.error(`[${sessionId}] Redis connection released`);
         } catch (error) {
           console.error(`[${sessionId}] Error closing Redis:`, error);
         }
@@ -186,6 +341,48 @@ export async function getOrCreateSession(
   return session;
 }
 
+/**
+ * Bind a session ID once at registration time, returning a lookup for handlers.
+ *
+ * The lookup hands back the same settled promise for as long as its session is still
+ * the one registered under `sessionId`, so a tool call costs one map check rather than
+ * a fresh async frame. Concurrent calls made while the session is being created share
+ * that creation.
+ */
+export function sessionResolver(
+  sessionId: string,
+  config: DatabaseConfig,
+  sessions: Map<string, DatabaseSession>
+): () => Promise<DatabaseSession> {
+  let session: DatabaseSession | undefined;
+  let lookup: Promise<DatabaseSession> | undefined;
+
+  return () => {
+    // Reuse the lookup while it is in flight or its session is still registered
+    if (lookup && (!session || sessions.get(sessionId) === session)) {
+      return lookup;
+    }
+
+    session = undefined;
+    const current = getOrCreateSession(sessionId, config, sessions);
+    lookup = current;
+    current.then(
+      resolved => {
+        if (lookup === current) {
+          session = resolved;
+        }
+      },
+      // Failures are not reused
+      () => {
+        if (lookup === current) {
+          lookup = undefined;
+        }
+      }
+    );
+    return current;
+  };
+}
+
 /**
  * Clean up expired sessions
  */
@@ -0,0 +1,93 @@
+/**
+ * In-Process Caching
+ *
+ * A small TTL cache with least-recently-used eviction, used to absorb bursts of
+ * identical reads (server info, keyspace listings, repeated queries), and a
+ * singleflight gate that merges identical reads still in flight.
+ */
+
+interface CacheEntry<V> {
+  value: V;
+  expiresAt: number;
+}
+
+export class TtlCache<K, V> {
+  private readonly entries = new Map<K, CacheEntry<V>>();
+  private readonly ttlMs: number;
+  private readonly maxSize: number;
+
+  constructor(ttlMs: number, maxSize: number = Infinity) {
+    this.ttlMs = ttlMs;
+    this.maxSize = maxSize;
+  }
+
+  /**
+   * Get a fresh cached value, or undefined when missing or expired
+   */
+  get(key: K): V | undefined {
+    const entry = this.entries.get(key);
+    if (!entry) {
+      return undefined;
+    }
+
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      return undefined;
+    }
+
+    // Re-insert so Map iteration order tracks recency
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    return entry.value;
+  }
+
+  /**
+   * Store a value, evicting the least recently used entries beyond maxSize
+   */
+  set(key: K, value: V): void {
+    this.entries.delete(key);
+    this.entries.set(key, { value, expiresAt: Date.now() + this.ttlMs });
+
+    while (this.entries.size > this.maxSize) {
+      const oldest = this.entries.keys().next();
+      if (oldest.done) {
+        break;
+      }
+      this.entries.delete(oldest.value);
+    }
+  }
+
+  delete(key: K): void {
+    this.entries.delete(key);
+  }
+
+  clear(): void {
+    this.entries.clear();
+  }
+
+  get size(): number {
+    return this.entries.size;
+  }
+}
+
+/**
+ * Share one in-flight call among concurrent callers asking for the same key.
+ *
+ * Unlike TtlCache nothing outlives the call: the key is released as soon as it settles,
+ * so only requests that overlap are merged.
+ */
+export class Singleflight<K, V> {
+  private readonly inFlight = new Map<K, Promise<V>>();
+
+  /**
+   * Run `call` for a key, or join the call already running for it
+   */
+  run(key: K, call: () => Promise<V>): Promise<V> {
+    let pending = this.inFlight.get(key);
+    if (!pending) {
+      pending = call().finally(() => this.inFlight.delete(key));
+      this.inFlight.set(key, pending);
+    }
+    return pending;
+  }
+}
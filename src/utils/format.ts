@@ -0,0 +1,225 @@
+/**
+ * Result Formatting
+ *
+ * Shared builders for MCP tool and resource results. Text content is always a string,
+ * so payloads are serialized exactly once and appended to their message prefix. With
+ * structured results enabled, JSON payloads are instead handed to the transport as
+ * structuredContent and encoded only when the response itself is framed.
+ */
+
+import { CallToolResult, ReadResourceResult } from '@modelcontextprotocol/sdk/types.js';
+
+// Whether JSON payloads are returned as structuredContent rather than embedded in text
+let structuredResults = false;
+
+/**
+ * Return JSON payloads as structured content, leaving only the message in text
+ */
+export function setStructuredResults(enabled: boolean): void {
+  structuredResults = enabled;
+}
+
+/**
+ * Encode values JSON has no representation for; only consulted when plain encoding fails
+ */
+function jsonFallback(_key: string, value: unknown): unknown {
+  return typeof value === 'bigint' ? value.toString() : value;
+}
+
+/**
+ * Serialize a value as compact JSON.
+ *
+ * Dates, ObjectIds and Decimal128s already encode themselves through toJSON, so the
+ * common case runs without a replacer; a replacer visits every value, so it is only
+ * used for a retry when plain encoding hits a BigInt.
+ */
+export function encodeJson(value: unknown): string {
+  // Empty listings are the common answer from a cold database; skip the encoder for them
+  if (Array.isArray(value) && value.length === 0) {
+    return '[]';
+  }
+  try {
+    return JSON.stringify(value);
+  } catch (error) {
+    if (!(error instanceof TypeError)) {
+      throw error;
+    }
+    return JSON.stringify(value, jsonFallback);
+  }
+}
+
+/**
+ * Build a plain text tool result
+ */
+export function textResult(text: string): CallToolResult {
+  return {
+    content: [
+      {
+        type: 'text',
+        text,
+      },
+    ],
+  };
+}
+
+/**
+ * Extract a human-readable message from a thrown value
+ */
+export function errorMessage(error: unknown): string {
+  return error instanceof Error ? error.message : 'Unknown error';
+}
+
+/**
+ * Build a failed tool result without logging, for failures that are the caller's to fix
+ */
+export function failedResult(text: string): CallToolResult {
+  return {
+    ...textResult(text),
+    isError: true,
+  };
+}
+
+/**
+ * Build a failed tool result, logging the original error for the operator
+ */
+export function errorResult(summary: string, error: unknown): CallToolResult {
+  console.error(`${summary}:`, error);
+  return failedResult(`${summary}: ${errorMessage(error)}`);
+}
+
+/**
+ * Fill `{name}` placeholders in a failure summary from the values a handler resolved,
+ * then from the tool call's arguments
+ */
+function describeFailure(
+  summary: string,
+  args: object,
+  resolved: Record<string, unknown>
+): string {
+  return summary.replace(/\{(\w+)\}/g, (_placeholder, name: string) =>
+    String(resolved[name] ?? (args as Record<string, unknown>)[name] ?? 'default')
+  );
+}
+
+/**
+ * Make a wrapper that turns anything a tool handler throws into a result built by `onError`.
+ *
+ * The wrapper takes the failure summary first; it may name arguments as `{name}`. A handler
+ * that fills in a left-out argument (such as the default database) records the value it
+ * used in `resolved`, so the summary reports that value; anything unresolved reads as
+ * "default".
+ */
+export function toolErrorHandler(onError: (summary: string, error: unknown) => CallToolResult) {
+  return <A extends object>(
+      summary: string,
+      handler: (args: A, resolved: Record<string, unknown>) => Promise<CallToolResult>
+    ) =>
+    async (args: A): Promise<CallToolResult> => {
+      const resolved: Record<string, unknown> = {};
+      try {
+        return await handler(args, resolved);
+      } catch (error) {
+        return onError(describeFailure(summary, args, resolved), error);
+      }
+    };
+}
+
+/**
+ * Wrap a tool handler so a thrown error is logged and returned as a failed result
+ */
+export const toolHandler = toolErrorHandler(errorResult);
+
+/**
+ * Build a tool result from a message prefix and a JSON-serializable payload.
+ *
+ * The payload is encoded compactly; large values such as hashes, lists or command
+ * replies would otherwise spend most of their serialization time on indentation.
+ */
+export function jsonResult(prefix: string, value: unknown): CallToolResult {
+  if (structuredResults) {
+    return structuredResult(prefix, value);
+  }
+  return textResult(prefix + encodeJson(value));
+}
+
+/**
+ * Build a tool result from a message prefix and an async sequence of JSON-serializable
+ * items, such as a database cursor
+ */
+export async function jsonSequenceResult<T>(
+  prefix: string,
+  items: AsyncIterable<T>,
+  toJson: (item: T) => unknown = item => item
+): Promise<CallToolResult> {
+  if (structuredResults) {
+    const data: unknown[] = [];
+    for await (const item of items) {
+      data.push(toJson(item));
+    }
+    return structuredResult(prefix, data);
+  }
+  return textResult(prefix + (await jsonLinesFrom(items, toJson)));
+}
+
+/**
+ * Build a tool result that carries its payload as structured content
+ */
+function structuredResult(prefix: string, data: unknown): CallToolResult {
+  return {
+    ...textResult(prefix.replace(/:\s*$/, '')),
+    structuredContent: { data },
+  };
+}
+
+/**
+ * Serialize an array as JSON with one compact element per line.
+ *
+ * Each element is encoded independently, so large result sets never go through
+ * a single indented pass over the whole payload; the output is still valid JSON.
+ */
+export function jsonLines(items: readonly unknown[]): string {
+  if (items.length === 0) {
+    return '[]';
+  }
+  return '[\n' + items.map(item => encodeJson(item)).join(',\n') + '\n]';
+}
+
+/**
+ * Serialize an async sequence the same way as jsonLines, encoding each element as it
+ * arrives so the whole result set is never held as objects at once.
+ */
+export async function jsonLinesFrom<T>(
+  items: AsyncIterable<T>,
+  toJson: (item: T) => unknown = item => item
+): Promise<string> {
+  const encoded: string[] = [];
+  for await (const item of items) {
+    encoded.push(encodeJson(toJson(item)));
+  }
+  return encoded.length === 0 ? '[]' : '[\n' + encoded.join(',\n') + '\n]';
+}
+
+/**
+ * Build a JSON resource result for a resource URI.
+ *
+ * Resources are consumed by clients rather than read by people, so the payload is
+ * encoded compactly: indentation only adds bytes and slows serialization.
+ */
+export function jsonResource(uri: URL, value: unknown): ReadResourceResult {
+  return jsonTextResource(uri, encodeJson(value));
+}
+
+/**
+ * Build a JSON resource result from text that is already encoded
+ */
+export function jsonTextResource(uri: URL, json: string): ReadResourceResult {
+  return {
+    contents: [
+      {
+        uri: uri.href,
+        mimeType: 'application/json',
+        text: json,
+      },
+    ],
+  };
+}
@@ -0,0 +1,67 @@
+import { describe, it, expect, jest, afterEach } from '@jest/globals';
+import { Singleflight, TtlCache } from '../../src/utils/cache.js';
+
+describe('TtlCache', () => {
+  afterEach(() => {
+    jest.useRealTimers();
+  });
+
+  it('returns cached values until they expire', () => {
+    jest.useFakeTimers();
+    const cache = new TtlCache<string, number>(1000);
+
+    cache.set('a', 1);
+    expect(cache.get('a')).toBe(1);
+
+    jest.advanceTimersByTime(1000);
+    expect(cache.get('a')).toBeUndefined();
+    expect(cache.size).toBe(0);
+  });
+
+  it('evicts the least recently used entry beyond maxSize', () => {
+    const cache = new TtlCache<string, number>(60_000, 2);
+
+    cache.set('a', 1);
+    cache.set('b', 2);
+    cache.get('a');
+    cache.set('c', 3);
+
+    expect(cache.get('a')).toBe(1);
+    expect(cache.get('b')).toBeUndefined();
+    expect(cache.get('c')).toBe(3);
+  });
+
+  it('supports explicit invalidation', () => {
+    const cache = new TtlCache<string, number>(60_000);
+
+    cache.set('a', 1);
+    cache.set('b', 2);
+    cache.delete('a');
+    expect(cache.get('a')).toBeUndefined();
+
+    cache.clear();
+    expect(cache.size).toBe(0);
+  });
+});
+
+describe('Singleflight', () => {
+  it('shares one call among concurrent callers for a key', async () => {
+    const flight = new Singleflight<string, number>();
+    const call = jest.fn(async () => 1);
+
+    const results = await Promise.all([flight.run('a', call), flight.run('a', call)]);
+
+    expect(results).toEqual([1, 1]);
+    expect(call).toHaveBeenCalledTimes(1);
+  });
+
+  it('releases the key once the call settles', async () => {
+    const flight = new Singleflight<string, number>();
+    const failing = jest.fn(async (): Promise<number> => {
+      throw new Error('boom');
+    });
+
+    await expect(flight.run('a', failing)).rejects.toThrow('boom');
+    await expect(flight.run('a', async () => 2)).resolves.toBe(2);
+  });
+});
@@ -0,0 +1,222 @@
+import { describe, it, expect } from '@jest/globals';
+import {
+  INSERT_VALUES_PATTERN,
+  PostgresManager,
+  assertStateless,
+  isCacheableQuery,
+  isReadOnlyQuery,
+  parseInsert,
+  quoteIdentifier,
+  quoteQualifiedName,
+  splitStatements,
+} from '../../src/managers/postgres.js';
+
+describe('parseInsert', () => {
+  it('splits a plain INSERT into its target and row tuples', () => {
+    expect(parseInsert("INSERT INTO users (id, name) VALUES (1, 'a');")).toEqual({
+      target: 'INSERT INTO users (id, name) VALUES',
+      key: 'INSERT INTO users (id, name) VALUES',
+      rows: "(1, 'a')",
+    });
+  });
+
+  it('normalizes whitespace in the merge key', () => {
+    const first = parseInsert('INSERT INTO users (id)\n  VALUES (1)');
+    const second = parseInsert('INSERT  INTO users (id) VALUES (2)');
+
+    expect(first?.key).toBe(second?.key);
+  });
+
+  it('keeps multi-row VALUES together', () => {
+    expect(parseInsert('INSERT INTO t (a) VALUES (1), (2), (3)')?.rows).toBe('(1), (2), (3)');
+  });
+
+  it('keeps string literals containing a closing parenthesis', () => {
+    expect(parseInsert("INSERT INTO t (a, b) VALUES ('x)', 'y')")?.rows).toBe("('x)', 'y')");
+  });
+
+  it('refuses statements that cannot be merged with others', () => {
+    expect(parseInsert('INSERT INTO t (a) VALUES (1) ON CONFLICT DO NOTHING')).toBeUndefined();
+    expect(parseInsert('INSERT INTO t (a) VALUES (1) RETURNING id')).toBeUndefined();
+    expect(parseInsert('INSERT INTO t (a) SELECT a FROM s')).toBeUndefined();
+    expect(parseInsert('INSERT INTO t DEFAULT VALUES')).toBeUndefined();
+    expect(parseInsert('INSERT INTO t VALUES (1)')).toBeUndefined();
+  });
+
+  it('refuses string literals containing a semicolon', () => {
+    expect(parseInsert("INSERT INTO t (a) VALUES ('a;b')")).toBeUndefined();
+  });
+
+  it('refuses trailing comments that would swallow appended rows', () => {
+    expect(parseInsert('INSERT INTO t (a) VALUES (1) -- note (x)')).toBeUndefined();
+    expect(parseInsert('INSERT INTO t (a) VALUES (1) /* note */')).toBeUndefined();
+  });
+
+  it('refuses multiple statements', () => {
+    expect(parseInsert('INSERT INTO t (a) VALUES (1); DELETE FROM t')).toBeUndefined();
+  });
+
+  it('matches INSERT_VALUES_PATTERN only up to VALUES in its first group', () => {
+    const match = INSERT_VALUES_PATTERN.exec('INSERT INTO s.t (a) VALUES (1)');
+
+    expect(match?.[1]).toBe('INSERT INTO s.t (a) VALUES');
+    expect(match?.[2]).toBe('(1)');
+  });
+});
+
+describe('isReadOnlyQuery', () => {
+  it('accepts single read statements', () => {
+    expect(isReadOnlyQuery('SELECT * FROM users')).toBe(true);
+    expect(isReadOnlyQuery('  show search_path;')).toBe(true);
+    expect(isReadOnlyQuery('VALUES (1), (2)')).toBe(true);
+    expect(isReadOnlyQuery('TABLE users')).toBe(true);
+  });
+
+  it('rejects writes and multiple statements', () => {
+    expect(isReadOnlyQuery('UPDATE users SET name = 1')).toBe(false);
+    expect(isReadOnlyQuery('WITH d AS (DELETE FROM t RETURNING *) SELECT * FROM d')).toBe(false);
+    expect(isReadOnlyQuery('SELECT 1; DELETE FROM t')).toBe(false);
+  });
+
+  it('rejects selects that create tables or lock rows', () => {
+    expect(isReadOnlyQuery('SELECT * INTO copy FROM users')).toBe(false);
+    expect(isReadOnlyQuery('SELECT * FROM users FOR UPDATE')).toBe(false);
+    expect(isReadOnlyQuery('SELECT * FROM users FOR NO KEY UPDATE')).toBe(false);
+    expect(isReadOnlyQuery('SELECT * FROM users FOR SHARE')).toBe(false);
+  });
+
+  it('rejects selects calling functions with side effects', () => {
+    expect(isReadOnlyQuery("SELECT nextval('users_id_seq')")).toBe(false);
+    expect(isReadOnlyQuery("SELECT setval('users_id_seq', 1)")).toBe(false);
+    expect(isReadOnlyQuery('SELECT pg_advisory_lock(1)')).toBe(false);
+    expect(isReadOnlyQuery("SELECT pg_notify('channel', 'x')")).toBe(false);
+  });
+});
+
+describe('isCacheableQuery', () => {
+  it('accepts deterministic reads', () => {
+    expect(isCacheableQuery('SELECT id FROM users WHERE id = 1')).toBe(true);
+  });
+
+  it('rejects reads whose result varies between calls', () => {
+    expect(isCacheableQuery('SELECT random()')).toBe(false);
+    expect(isCacheableQuery('SELECT now()')).toBe(false);
+    expect(isCacheableQuery('SELECT current_timestamp')).toBe(false);
+    expect(isCacheableQuery('SELECT gen_random_uuid()')).toBe(false);
+  });
+
+  it('rejects anything that is not read-only', () => {
+    expect(isCacheableQuery("SELECT nextval('users_id_seq')")).toBe(false);
+  });
+});
+
+describe('quoteIdentifier', () => {
+  it('quotes a valid identifier, folding it to lower case', () => {
+    expect(quoteIdentifier('users')).toBe('"users"');
+    expect(quoteIdentifier('Users')).toBe('"users"');
+    expect(quoteIdentifier('_tmp$1')).toBe('"_tmp$1"');
+  });
+
+  it('rejects anything but a plain identifier', () => {
+    expect(() => quoteIdentifier('users; DROP TABLE t')).toThrow(
+      "Invalid identifier 'users; DROP TABLE t'"
+    );
+    expect(() => quoteIdentifier('a"b')).toThrow();
+    expect(() => quoteIdentifier('1users')).toThrow();
+    expect(() => quoteIdentifier('')).toThrow();
+    expect(() => quoteIdentifier('a'.repeat(64))).toThrow();
+  });
+
+  it('quotes each part of a schema-qualified name', () => {
+    expect(quoteQualifiedName('Public.Users')).toBe('"public"."users"');
+    expect(() => quoteQualifiedName('public.')).toThrow();
+  });
+});
+
+describe('splitStatements', () => {
+  it('splits on semicolons outside literals, identifiers and comments', () => {
+    expect(splitStatements('SELECT \'a;b\' FROM "x;y"; -- c;\nSELECT 1 /* ; */;')).toEqual([
+      'SELECT \'\' FROM "x;y"',
+      'SELECT 1',
+    ]);
+  });
+
+  it('keeps dollar-quoted bodies and nested comments together', () => {
+    expect(
+      splitStatements('DO $f$ BEGIN PERFORM 1; END $f$; /* a /* ; */ ; */ SELECT $1')
+    ).toEqual(['DO $$', 'SELECT $1']);
+  });
+
+  it('treats backslashes as escapes only in E strings', () => {
+    expect(splitStatements("SELECT E'\\';'; SELECT '\\'; SELECT 2")).toEqual([
+      "SELECT E''",
+      "SELECT ''",
+      'SELECT 2',
+    ]);
+  });
+});
+
+describe('assertStateless', () => {
+  it('accepts statements whose literals mention session keywords', () => {
+    expect(() =>
+      assertStateless("INSERT INTO logs (msg) VALUES ('step 1; end of batch')")
+    ).not.toThrow();
+    expect(() => assertStateless("UPDATE t SET note = 'a; set later'")).not.toThrow();
+    expect(() => assertStateless('DO $$ BEGIN PERFORM 1; END $$')).not.toThrow();
+  });
+
+  it('rejects session-scoped statements anywhere in the SQL', () => {
+    expect(() => assertStateless('BEGIN')).toThrow('BEGIN is not supported');
+    expect(() => assertStateless('-- note\nset search_path = x')).toThrow('SET is not supported');
+    expect(() => assertStateless('SELECT 1; COMMIT')).toThrow('COMMIT is not supported');
+    expect(() => assertStateless("SELECT '$$'; SET search_path = evil")).toThrow(
+      'SET is not supported'
+    );
+    expect(() => assertStateless('CREATE TEMP TABLE x (a int)')).toThrow(
+      'CREATE TEMP is not supported'
+    );
+    expect(() => assertStateless('LISTEN events')).toThrow('LISTEN is not supported');
+  });
+
+  it('rejects session-level settings and advisory locks', () => {
+    expect(() => assertStateless("SELECT set_config('search_path', 'x', false)")).toThrow(
+      'set_config()'
+    );
+    expect(() => assertStateless('SELECT pg_advisory_lock(1)')).toThrow('pg_advisory_lock()');
+    expect(() => assertStateless("SELECT set_config('search_path', 'x', true)")).not.toThrow();
+    expect(() => assertStateless('SELECT pg_advisory_xact_lock(1)')).not.toThrow();
+  });
+});
+
+describe('PostgresManager.query', () => {
+  it('returns the last result of SQL holding several statements', async () => {
+    const manager = new PostgresManager('postgres://localhost/app');
+    const inserted = { command: 'INSERT', rows: [], fields: [] };
+    const selected = { command: 'SELECT', rows: [{ id: 1 }], fields: [{ name: 'id' }] };
+    // pg resolves multi-statement SQL to an array with one result per statement
+    Object.assign(manager, { pool: () => ({ query: async () => [inserted, selected] }) });
+
+    const result = await manager.query('app', 'INSERT INTO t (a) VALUES (1); SELECT 1 AS id');
+
+    expect(result).toBe(selected);
+  });
+
+  it('bumps the write generation only once a write has finished', async () => {
+    const manager = new PostgresManager('postgres://localhost/app');
+    const generations: number[] = [];
+    const updated = { command: 'UPDATE', rows: [], fields: [] };
+    Object.assign(manager, {
+      pool: () => ({
+        query: async () => {
+          generations.push(manager.writeGeneration('app'));
+          return [updated, updated];
+        },
+      }),
+    });
+
+    await manager.query('app', 'UPDATE t SET a = 1; UPDATE t SET b = 2');
+
+    expect(generations).toEqual([0]);
+    expect(manager.writeGeneration('app')).toBe(1);
+  });
+});
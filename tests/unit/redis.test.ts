@@ -0,0 +1,112 @@
+import { describe, it, expect, jest } from '@jest/globals';
+import type Redis from 'ioredis';
+import { RedisManager, assertSharedClientSafe } from '../../src/managers/redis.js';
+
+describe('assertSharedClientSafe', () => {
+  it('accepts ordinary commands', () => {
+    expect(() =>
+      assertSharedClientSafe([
+        ['GET', 'a'],
+        ['set', 'a', '1'],
+        ['XREAD', 'COUNT', '10', 'STREAMS', 'events', '0'],
+        ['CLIENT', 'LIST'],
+        ['client', 'info'],
+      ])
+    ).not.toThrow();
+  });
+
+  it('rejects SELECT, pointing at the database argument', () => {
+    expect(() => assertSharedClientSafe([['select', '1']])).toThrow(
+      'SELECT is not supported; pass the database argument instead'
+    );
+  });
+
+  it('rejects connection-state commands in any case', () => {
+    for (const command of ['MULTI', 'exec', 'Watch', 'unwatch', 'MONITOR', 'reset', 'QUIT']) {
+      expect(() => assertSharedClientSafe([[command]])).toThrow(
+        `${command.toUpperCase()} is not supported: it would change the state of a connection`
+      );
+    }
+  });
+
+  it('rejects every SUBSCRIBE variant', () => {
+    const variants = ['SUBSCRIBE', 'psubscribe', 'SSUBSCRIBE', 'unsubscribe', 'PUNSUBSCRIBE'];
+    for (const command of variants) {
+      expect(() => assertSharedClientSafe([[command, 'channel']])).toThrow(
+        `${command.toUpperCase()} is not supported`
+      );
+    }
+  });
+
+  it('rejects CLIENT subcommands that change the calling connection', () => {
+    expect(() => assertSharedClientSafe([['CLIENT', 'setname', 'x']])).toThrow(
+      'CLIENT SETNAME is not supported'
+    );
+    expect(() => assertSharedClientSafe([['client', 'TRACKING', 'on']])).toThrow(
+      'CLIENT TRACKING is not supported'
+    );
+    expect(() => assertSharedClientSafe([['CLIENT', 'reply', 'off']])).toThrow(
+      'CLIENT REPLY is not supported'
+    );
+  });
+
+  it('rejects blocking commands', () => {
+    expect(() => assertSharedClientSafe([['blpop', 'queue', '0']])).toThrow(
+      'BLPOP is not supported: it would block a connection'
+    );
+    expect(() => assertSharedClientSafe([['BZPOPMIN', 'set', '0']])).toThrow('BZPOPMIN');
+    expect(() => assertSharedClientSafe([['WAIT', '1', '0']])).toThrow('WAIT');
+    expect(() =>
+      assertSharedClientSafe([['xread', 'block', '0', 'STREAMS', 'events', '$']])
+    ).toThrow('XREAD BLOCK is not supported');
+    expect(() =>
+      assertSharedClientSafe([['XREADGROUP', 'GROUP', 'g', 'c', 'BLOCK', '0', 'STREAMS', 's', '>']])
+    ).toThrow('XREADGROUP BLOCK is not supported');
+  });
+
+  it('rejects a pipeline when any of its commands is unsafe', () => {
+    expect(() =>
+      assertSharedClientSafe([
+        ['SET', 'a', '1'],
+        ['MULTI'],
+        ['GET', 'a'],
+      ])
+    ).toThrow('MULTI is not supported');
+  });
+});
+
+describe('RedisManager', () => {
+  // A client that fails the test if a command ever reaches a connection
+  function managerWithoutConnection() {
+    const duplicate = jest.fn();
+    const client = { options: {}, duplicate } as unknown as Redis;
+    return { manager: new RedisManager(client), duplicate };
+  }
+
+  it('rejects unsafe commands before touching a connection', async () => {
+    const { manager, duplicate } = managerWithoutConnection();
+
+    await expect(manager.executeCommand('subscribe', ['channel'])).rejects.toThrow(
+      'SUBSCRIBE is not supported'
+    );
+    await expect(
+      manager.executePipeline([
+        ['GET', 'a'],
+        ['BRPOP', 'queue', '0'],
+      ])
+    ).rejects.toThrow('BRPOP is not supported');
+    expect(duplicate).not.toHaveBeenCalled();
+  });
+
+  it('rejects invalid database numbers before connecting', async () => {
+    const { manager, duplicate } = managerWithoutConnection();
+
+    await expect(manager.executeCommand('GET', ['a'], -1)).rejects.toThrow(
+      'Invalid Redis database -1'
+    );
+    await expect(manager.executeCommand('GET', ['a'], 1.5)).rejects.toThrow(
+      'Invalid Redis database 1.5'
+    );
+    expect(duplicate).not.toHaveBeenCalled();
+  });
+});